@@ -0,0 +1,416 @@
+#!/usr/bin/python3
+
+import struct
+from protel_reader import BinaryReader, INT16, INT32, UINT16, UINT32
+
+
+# Page layout of Jet 4 databases (Access 2000...2003). Protel .DDB files
+# are such databases.
+PAGE_SIZE = 4096
+
+PAGE_DATA = 0x01
+PAGE_TABLE_DEFINITION = 0x02
+
+# Row offsets on data pages: flags in the upper bits
+ROW_OFFSET_MASK = 0x1FFF
+ROW_DELETED = 0x8000        # Also set on rows moved here from another page
+ROW_OVERFLOW = 0x4000       # Row holds a pointer to the moved row data
+
+# Long value (OLE, memo) header flags
+LVAL_INLINE = 0x80000000
+LVAL_SINGLE_PAGE = 0x40000000
+LVAL_LENGTH_MASK = 0x3FFFFFFF
+
+# Errors raised while reading a database the reader does not understand
+# (unexpected page layouts show up as out of range offsets or short
+# records, text as decoding errors)
+READ_ERRORS = (RuntimeError, struct.error, IndexError, KeyError, ValueError)
+
+# Column types
+COLUMN_BOOL = 0x01
+COLUMN_BYTE = 0x02
+COLUMN_INT = 0x03
+COLUMN_LONGINT = 0x04
+COLUMN_MONEY = 0x05
+COLUMN_FLOAT = 0x06
+COLUMN_DOUBLE = 0x07
+COLUMN_DATETIME = 0x08
+COLUMN_BINARY = 0x09
+COLUMN_TEXT = 0x0A
+COLUMN_OLE = 0x0B
+COLUMN_MEMO = 0x0C
+COLUMN_GUID = 0x0F
+
+# Fixed size columns that are decoded as numbers
+COLUMN_NUMBERS = {
+    COLUMN_BYTE: struct.Struct('<B'),
+    COLUMN_INT: INT16,
+    COLUMN_LONGINT: INT32,
+    COLUMN_MONEY: struct.Struct('<q'),
+    COLUMN_FLOAT: struct.Struct('<f'),
+    COLUMN_DOUBLE: struct.Struct('<d'),
+    COLUMN_DATETIME: struct.Struct('<d'),   # Days since 1899-12-30
+}
+
+# Catalog of all tables
+CATALOG_PAGE = 2
+OBJECT_TABLE = 1
+
+
+def decode_text (data):
+    '''
+    Jet 4 text is UCS-2. "Compressed" text starts with FF FE, then
+    alternates between runs of one byte per character and runs of two
+    bytes per character. A 00 byte switches between them.
+    '''
+    data = bytes(data)
+    if data[:2] != b"\xff\xfe":
+        return data.decode("utf-16-le", "replace")
+    if b"\x00" not in data:
+        # Only one byte per character
+        return data[2:].decode("latin-1")
+
+    chars = bytearray()
+    compressed = True
+    i = 2
+    while i < len(data):
+        if data[i] == 0:
+            compressed = not compressed
+            i += 1
+        elif compressed:
+            chars += data[i:i+1] + b"\x00"
+            i += 1
+        else:
+            chars += data[i:i+2]
+            i += 2
+    return chars.decode("utf-16-le", "replace")
+
+
+class JetColumn:
+    def __init__ (self, entry, name):
+        '''
+        Column entry of a table definition (25 bytes)
+
+        0:          Type
+        1...4:      ?
+        5...6:      Column number (bit in the null mask)
+        7...8:      Index in the variable length column table
+        9...10:     ?
+        11...14:    ?
+        15:         Flags (bit 0: fixed length)
+        16...20:    ?
+        21...22:    Offset of fixed length columns in the row
+        23...24:    Length
+        '''
+        self.name = name
+        self.type = entry[0]
+        self.number = UINT16.unpack_from(entry, 5)[0]
+        self.var_index = UINT16.unpack_from(entry, 7)[0]
+        self.fixed = (entry[15] & 0x01) != 0
+        self.fixed_offset = UINT16.unpack_from(entry, 21)[0]
+        self.size = UINT16.unpack_from(entry, 23)[0]
+
+
+class JetTable:
+    def __init__ (self, name, page):
+        self.name = name
+        self.page = page
+        self.columns = []
+        self.num_var_columns = 0
+        self.usage_map = 0
+
+
+class JetDatabase:
+    '''
+    Read-only access to the tables of a Jet 4 database file, without
+    external tools.
+
+    Only what is needed to read whole tables is supported: the catalog,
+    table definitions, data pages (found through the usage map of a table)
+    and long values (OLE/memo) stored in the row, on one page or on a chain
+    of pages. Indexes are not used.
+    '''
+
+    def __init__ (self, source):
+        self.reader = BinaryReader(source)
+        self.data = self.reader.data
+        if len(self.data) < 3 * PAGE_SIZE:
+            self.close()
+            raise RuntimeError("Not a Jet database (file too short)")
+        version = self.data[0x14]
+        if self.data[0] != 0 or version not in (1, 2):
+            self.close()
+            raise RuntimeError(f"Unsupported Jet database version {version}")
+        self.num_pages = len(self.data) // PAGE_SIZE
+        self.tables = None
+
+    @classmethod
+    def open (cls, path):
+        with open(path, "rb") as f:
+            return cls(f)
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.close()
+
+    def close (self):
+        self.data = None
+        self.reader.close()
+
+    def page (self, number):
+        if number >= self.num_pages:
+            raise RuntimeError(f"Page {number} beyond end of database")
+        return self.data[number * PAGE_SIZE : (number + 1) * PAGE_SIZE]
+
+    @staticmethod
+    def row_bounds (page, row):
+        '''
+        Data page
+
+        0:          Page type (0x01)
+        1:          ?
+        2...3:      Free space
+        4...7:      Page of the table definition
+        8...11:     ?
+        12...13:    Number N of rows
+        14...:      N row offsets (2 bytes). Rows are stored from the end
+                    of the page. The upper bits are flags.
+
+        Returns the offset flags, start and end of a row.
+        '''
+        offset = UINT16.unpack_from(page, 14 + 2 * row)[0]
+        end = PAGE_SIZE
+        if row > 0:
+            end = UINT16.unpack_from(page, 12 + 2 * row)[0] & ROW_OFFSET_MASK
+        return offset & ~ROW_OFFSET_MASK, offset & ROW_OFFSET_MASK, end
+
+    def row_at (self, pointer):
+        # Row addressed by a pointer (page number << 8 | row number)
+        page = self.page(pointer >> 8)
+        flags, start, end = self.row_bounds(page, pointer & 0xFF)
+        return page[start:end]
+
+    def read_table_definition (self, name, page_number):
+        '''
+        Table definition. Continues on the pages linked by 'next page',
+        their data starts at offset 8.
+
+        0:          Page type (0x02)
+        4...7:      Next page (0 = none)
+        16...19:    Number of rows
+        43...44:    Number of variable length columns
+        45...46:    Number N of columns
+        51...54:    Number M of index entries
+        55...58:    Usage map (row pointer)
+        63...:      M index entries (12 bytes)
+        ...:        N column entries (25 bytes)
+        ...:        N column names (2 bytes length + UCS-2)
+        '''
+        page = self.page(page_number)
+        if page[0] != PAGE_TABLE_DEFINITION:
+            raise RuntimeError(f"Table '{name}': page {page_number} is not a table definition")
+        chunks = [page]
+        next_page = UINT32.unpack_from(page, 4)[0]
+        while next_page != 0:
+            page = self.page(next_page)
+            chunks.append(page[8:])
+            next_page = UINT32.unpack_from(page, 4)[0]
+        tdef = b"".join(chunks)
+
+        table = JetTable(name, page_number)
+        table.num_var_columns = UINT16.unpack_from(tdef, 43)[0]
+        num_columns = UINT16.unpack_from(tdef, 45)[0]
+        num_indexes = UINT32.unpack_from(tdef, 51)[0]
+        table.usage_map = UINT32.unpack_from(tdef, 55)[0]
+
+        offset = 63 + 12 * num_indexes
+        entries = []
+        for i in range(num_columns):
+            entries.append(tdef[offset:offset+25])
+            offset += 25
+        for entry in entries:
+            length = UINT16.unpack_from(tdef, offset)[0]
+            column_name = decode_text(tdef[offset+2:offset+2+length])
+            offset += 2 + length
+            table.columns.append(JetColumn(entry, column_name))
+        table.columns.sort(key=lambda column: column.number)
+        return table
+
+    def table_pages (self, table):
+        '''
+        Numbers of the data pages of a table, from its usage map.
+
+        Usage map type 0:   1...4:  First page
+                            5...:   Bitmap of the pages that follow
+        Usage map type 1:   1...:   Page numbers (4 bytes) of bitmap
+                                    pages, each covering (4096-4)*8 pages.
+                                    Their bitmap starts at offset 4.
+        '''
+        usage_map = self.row_at(table.usage_map)
+        if usage_map[0] == 0:
+            first = UINT32.unpack_from(usage_map, 1)[0]
+            bitmaps = [(first, usage_map[5:])]
+        elif usage_map[0] == 1:
+            pages_per_bitmap = (PAGE_SIZE - 4) * 8
+            bitmaps = []
+            for i in range((len(usage_map) - 1) // 4):
+                bitmap_page = UINT32.unpack_from(usage_map, 1 + 4 * i)[0]
+                if bitmap_page != 0:
+                    bitmaps.append((i * pages_per_bitmap, self.page(bitmap_page)[4:]))
+        else:
+            # Unknown map, look at all pages instead
+            bitmaps = [(0, b"\xff" * ((self.num_pages + 7) // 8))]
+
+        for first, bitmap in bitmaps:
+            for index, bits in enumerate(bitmap):
+                if bits == 0:
+                    continue
+                for bit in range(8):
+                    if bits & (1 << bit):
+                        number = first + 8 * index + bit
+                        if number >= self.num_pages:
+                            return
+                        # Pages listed in the map may have been reused
+                        page = self.page(number)
+                        if (page[0] == PAGE_DATA) and (UINT32.unpack_from(page, 4)[0] == table.page):
+                            yield number
+
+    def read_long_value (self, field):
+        '''
+        OLE and memo columns (12 byte header + data)
+
+        0...3:      Length, flags in the upper bits
+        4...7:      Row pointer (not inline)
+        8...11:     ?
+        12...:      Data (inline)
+
+        Data on a single page is the whole row. A chain of pages starts
+        each row with the row pointer of the next part (0 = last).
+        '''
+        header = UINT32.unpack_from(field, 0)[0]
+        length = header & LVAL_LENGTH_MASK
+        if header & LVAL_INLINE:
+            return bytes(field[12:12+length])
+        pointer = UINT32.unpack_from(field, 4)[0]
+        if header & LVAL_SINGLE_PAGE:
+            return bytes(self.row_at(pointer)[:length])
+
+        parts = []
+        size = 0
+        while pointer != 0 and size < length:
+            row = self.row_at(pointer)
+            parts.append(row[4:])
+            size += len(row) - 4
+            pointer = UINT32.unpack_from(row, 0)[0]
+        return b"".join(parts)[:length]
+
+    def decode_value (self, column, field):
+        kind = column.type
+        layout = COLUMN_NUMBERS.get(kind, None)
+        if layout is not None:
+            value = layout.unpack_from(field, 0)[0]
+            if kind == COLUMN_MONEY:
+                value /= 10000
+            return value
+        if kind == COLUMN_TEXT:
+            return decode_text(field)
+        if (kind == COLUMN_OLE) or (kind == COLUMN_MEMO):
+            if len(field) < 12:
+                return b"" if kind == COLUMN_OLE else ""
+            value = self.read_long_value(field)
+            return value if kind == COLUMN_OLE else decode_text(value)
+        return bytes(field)
+
+    def decode_row (self, table, row, columns=None):
+        '''
+        Row
+
+        0...1:      Number N of columns in this row
+        2...:       Fixed length columns
+        ...:        Variable length columns
+        ...:        Offsets of the variable length columns (2 bytes each,
+                    last column first), preceded by the end offset
+        end-B-2:    Number V of variable length columns
+        end-B:      Null mask (B = (N+7)/8 bytes, bit set = not null)
+
+        Only the columns named in 'columns' are decoded (all if None).
+        '''
+        num_columns = UINT16.unpack_from(row, 0)[0]
+        mask_size = (num_columns + 7) // 8
+        end = len(row)
+        null_mask = row[end - mask_size:end]
+
+        num_var = 0
+        var_offsets = []
+        if table.num_var_columns > 0:
+            num_var = UINT16.unpack_from(row, end - mask_size - 2)[0]
+            var_offsets = [UINT16.unpack_from(row, end - mask_size - 4 - 2 * i)[0]
+                           for i in range(num_var + 1)]
+        num_fixed = num_columns - num_var
+
+        values = {}
+        fixed_found = 0
+        for column in table.columns:
+            # Fixed length columns are counted even if not decoded, a row
+            # only holds the first 'num_fixed' of them
+            fixed_index = fixed_found
+            if column.fixed:
+                fixed_found += 1
+            if (columns is not None) and (column.name not in columns):
+                continue
+
+            byte = column.number // 8
+            present = (byte < mask_size) and (null_mask[byte] & (1 << (column.number % 8))) != 0
+            if column.type == COLUMN_BOOL:
+                values[column.name] = present
+                continue
+
+            field = None
+            if column.fixed:
+                if fixed_index < num_fixed:
+                    start = 2 + column.fixed_offset
+                    field = row[start:start + column.size]
+            elif column.var_index < num_var:
+                field = row[var_offsets[column.var_index]:var_offsets[column.var_index + 1]]
+
+            if (not present) or (field is None):
+                values[column.name] = None
+            else:
+                values[column.name] = self.decode_value(column, field)
+        return values
+
+    def iter_table_rows (self, table, columns=None):
+        for number in self.table_pages(table):
+            page = self.page(number)
+            for row in range(UINT16.unpack_from(page, 12)[0]):
+                flags, start, end = self.row_bounds(page, row)
+                if flags & ROW_DELETED:
+                    continue
+                if flags & ROW_OVERFLOW:
+                    data = self.row_at(UINT32.unpack_from(page, start)[0])
+                else:
+                    data = page[start:end]
+                yield self.decode_row(table, data, columns)
+
+    def get_tables (self):
+        # Table name -> page of the table definition, from the catalog
+        # (MSysObjects)
+        if self.tables is None:
+            catalog = self.read_table_definition("MSysObjects", CATALOG_PAGE)
+            self.tables = {}
+            for row in self.iter_table_rows(catalog):
+                if (row.get("Type") is not None) and ((row["Type"] & 0x7F) == OBJECT_TABLE):
+                    self.tables[row["Name"]] = row["Id"] & 0x00FFFFFF
+        return self.tables
+
+    def iter_rows (self, name, columns=None):
+        # All rows of a table as dicts (column name -> value). Null values
+        # are None, OLE columns are bytes. With a list of 'columns', only
+        # those are read (e.g. to leave out large OLE columns).
+        page_number = self.get_tables().get(name, None)
+        if page_number is None:
+            raise RuntimeError(f"Table '{name}' not found")
+        table = self.read_table_definition(name, page_number)
+        return self.iter_table_rows(table, columns)
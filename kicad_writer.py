@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+
+# Default number of characters collected before they are written to the file
+FLUSH_SIZE = 1 << 20
+
+
+class KicadWriter:
+    '''
+    Buffered writer for KiCad S-expression files.
+
+    The to_kicad7() methods write their output as many small strings. The
+    writer collects them in a list and hands them to the underlying file as
+    one joined chunk whenever 'flush_size' characters have accumulated.
+    close() writes the rest and closes the file, so use it as a context
+    manager, or call close() explicitly.
+    '''
+
+    def __init__ (self, file, flush_size=FLUSH_SIZE):
+        self.file = file
+        self.flush_size = flush_size
+        self.chunks = []
+        self.size = 0
+
+    @classmethod
+    def open (cls, path, flush_size=FLUSH_SIZE):
+        return cls(open(path, "w"), flush_size)
+
+    @property
+    def name (self):
+        return self.file.name
+
+    def write (self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= self.flush_size:
+            self.flush()
+
+    def flush (self):
+        if self.chunks:
+            self.file.write("".join(self.chunks))
+            self.chunks = []
+            self.size = 0
+        self.file.flush()
+
+    def close (self):
+        if self.file is not None:
+            try:
+                self.flush()
+            finally:
+                self.file.close()
+                self.file = None
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+import hashlib
+import json
+import os
+from model_cache import PARSER_MODULES, get_converter_version
+
+
+# Name of the manifest file in the output directory
+MANIFEST_NAME = "manifest.json"
+
+# Name of the record of extracted items in a database folder
+ITEM_RECORD_NAME = "extracted.json"
+
+# Sources that make up the converter output (parsers and writers)
+CONVERTER_MODULES = PARSER_MODULES + ("kicad_project.py", "kicad_writer.py", "p2k.py")
+
+
+def hash_file (path):
+    # SHA-256 of a file's content, or None if it does not exist
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                h.update(block)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def hash_data (data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    '''
+    Record of the documents converted into an output directory.
+
+    For every input document the manifest keeps the hash of its content,
+    the converter version, the hashes of other files that went into the
+    output (e.g. images on a schematic, None if missing) and the hashes of
+    the output files. A document is current if all of them are unchanged.
+
+    Inputs whose hash is already known (e.g. documents extracted from a
+    .DDB, or held in memory) are taken from 'digests' (path -> hash)
+    instead of reading the file.
+    '''
+
+    def __init__ (self, directory, digests=None):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.digests = {} if digests is None else digests
+        self.version = get_converter_version(CONVERTER_MODULES)
+        self.documents = {}
+        try:
+            with open(self.path, "r") as f:
+                self.documents = json.load(f).get("documents", {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            print(f"  ignoring damaged manifest {self.path}")
+
+    def hash_input (self, path):
+        digest = self.digests.get(path, None)
+        if digest is not None:
+            return digest
+        return hash_file(path)
+
+    def is_current (self, name, outputs=None):
+        # True if 'name' was converted by this version from the same input,
+        # and its outputs are still intact. With 'outputs', the recorded
+        # outputs must also be among them (the output name of a document
+        # can change, see p2k.document_names()).
+        entry = self.documents.get(os.path.normpath(name), None)
+        if (entry is None) or (entry.get("version") != self.version):
+            return False
+        if outputs is not None:
+            expected = {os.path.normpath(path) for path in outputs}
+            if any(os.path.normpath(path) not in expected for path in entry.get("outputs", {})):
+                return False
+        if entry.get("input") != self.hash_input(name):
+            return False
+        for path, digest in entry.get("depends", {}).items():
+            if self.hash_input(path) != digest:
+                return False
+        for path, digest in entry.get("outputs", {}).items():
+            if hash_file(path) != digest:
+                return False
+        return True
+
+    def record (self, name, outputs, depends=()):
+        # Register a converted document. Outputs that were not created are
+        # left out.
+        self.documents[os.path.normpath(name)] = {
+            "version": self.version,
+            "input": self.hash_input(name),
+            "depends": {path: self.hash_input(path) for path in depends},
+            "outputs": {path: digest for path, digest in
+                        ((path, hash_file(path)) for path in outputs) if digest is not None},
+            }
+
+    def save (self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"documents": self.documents}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class ItemRecord:
+    '''
+    Content hashes of the items extracted from a database into a folder.
+
+    An item whose content has the same hash as at the last extraction is
+    not written again, as long as its file is still there with the same
+    size. Items that are no longer in the database are dropped from the
+    record (their files are left alone).
+    '''
+
+    def __init__ (self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, ITEM_RECORD_NAME)
+        self.previous = {}
+        self.items = {}
+        try:
+            with open(self.path, "r") as f:
+                self.previous = json.load(f).get("items", {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            print(f"  ignoring damaged record {self.path}")
+
+    def is_current (self, name, digest):
+        # True if item 'name' (path relative to the folder) was extracted
+        # before with the same content
+        entry = self.previous.get(name, None)
+        if (entry is None) or (entry.get("hash") != digest):
+            return False
+        try:
+            return os.path.getsize(os.path.join(self.directory, name)) == entry.get("size")
+        except OSError:
+            return False
+
+    def record (self, name, digest, size):
+        self.items[name] = {"hash": digest, "size": size}
+
+    def save (self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"items": self.items}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
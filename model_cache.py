@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+
+import hashlib
+import os
+import pickle
+
+
+# Default size limit of a cache directory (bytes)
+CACHE_SIZE = 1 << 30
+
+# Parser sources. Their content is part of every key, so models parsed by
+# another version of the converter are never loaded.
+PARSER_MODULES = ("protel_pcb.py", "protel_primitive.py", "protel_reader.py", "protel_sch.py")
+
+converter_versions = {}
+
+
+def get_converter_version (modules=PARSER_MODULES):
+    # The converter has no release number. Its version is the hash of the
+    # sources that make up the result.
+    version = converter_versions.get(modules, None)
+    if version is None:
+        h = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in modules:
+            with open(os.path.join(directory, name), "rb") as f:
+                h.update(f.read())
+        version = h.hexdigest()
+        converter_versions[modules] = version
+    return version
+
+
+class ModelCache:
+    '''
+    On-disk cache of parsed models (Board, Schematic, SchematicLibrary).
+
+    Every entry is a pickled model in a file named by its key. The key is
+    a hash of the document content, the document name (models keep it for
+    their output) and the converter version. Entries are never updated, a
+    changed document simply gets a new key.
+
+    A hit refreshes the modification time of the entry. When the entries
+    exceed 'max_size' bytes, the least recently used ones are removed.
+    '''
+
+    SUFFIX = ".pickle"
+
+    def __init__ (self, directory, max_size=CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.entries = None             # Key -> [last use, size]
+        os.makedirs(directory, exist_ok=True)
+
+    def key (self, name, data):
+        h = hashlib.sha256(get_converter_version().encode())
+        h.update(name.encode() + b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    def path (self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def scan (self):
+        # Index the entries of the cache directory once
+        if self.entries is None:
+            self.entries = {}
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    key = entry.name[:-len(self.SUFFIX)]
+                    self.entries[key] = [stat.st_mtime, stat.st_size]
+        return self.entries
+
+    def load (self, key):
+        # Returns the cached model, or None
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Damaged entry (e.g. interrupted write of an older version)
+            self.remove(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if self.entries is not None and key in self.entries:
+            self.entries[key][0] = os.path.getmtime(path)
+        return model
+
+    def store (self, key, model):
+        # Write to a temporary file first, so that other processes never
+        # see a partial entry
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        stat = os.stat(path)
+        self.scan()[key] = [stat.st_mtime, stat.st_size]
+        self.evict()
+
+    def remove (self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        if self.entries is not None:
+            self.entries.pop(key, None)
+
+    def evict (self):
+        # Remove least recently used entries until the cache fits
+        entries = self.scan()
+        size = sum(entry[1] for entry in entries.values())
+        if size <= self.max_size:
+            return
+        for key in sorted(entries, key=lambda key: entries[key][0]):
+            size -= entries[key][1]
+            self.remove(key)
+            if size <= self.max_size:
+                break
@@ -2,14 +2,23 @@
 
 import argparse
 import base64
+import concurrent.futures
+import contextlib
+import io
+from jet_reader import JetDatabase, READ_ERRORS
 import json
 from kicad_project import KicadProject
+from kicad_writer import KicadWriter
+from manifest import ItemRecord, Manifest, hash_data
+from model_cache import CACHE_SIZE, ModelCache
 import os
 from protel_pcb import Board
+from protel_reader import BinaryReader
 from protel_sch import Schematic, SchematicLibrary
 import signal
 import subprocess
 import sys
+import traceback
 
 
 
@@ -19,35 +28,61 @@ def sigint_handler (signal, frame):
     sys.exit(0)
 
 
+# Worker processes leave Ctrl-C to the main process
+def worker_init ():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-def protel_read_string (f):
-    s = ""
 
-    length = f.read(1)[0]
-    if length > 0:
-        bytestring = f.read(length)
-        s = bytestring.decode("iso8859_15")
 
-    return s
+def parse_cached (cache, name, reader, parse):
+    # Returns the model of a document. With a cache, a model parsed before
+    # from the same content is loaded instead of calling parse().
+    if cache is None:
+        return parse()
+    key = cache.key(name, reader.data)
+    model = cache.load(key)
+    if model is not None:
+        print("  loaded from cache")
+    else:
+        model = parse()
+        cache.store(key, model)
+    return model
+
 
+def convert_pcb (project_name, ppcb, kpcb, kpcblib_path, kpro, cache=None, jobs=1):
+    # Binary files are memory-mapped (or used in place if the document is
+    # already in memory) and decoded without copying the records. With
+    # jobs > 1 the large sections (or the record blocks of an ASCII file)
+    # are decoded in a pool of worker processes.
+    view = BinaryReader(ppcb)
 
-def convert_pcb (project_name, ppcb, kpcb, kpcblib_path, kpro):
     # See if file starts with known header of binary PCB file
-    s = protel_read_string(ppcb)
-    ppcb.seek(0)
+    s = view.string8()
+    view.seek(0)
 
     if s == "PCB 3.0 Binary File":
         print("convert_pcb bin 3.0")
-        pcb = Board.from_protel_bin(project_name, ppcb, version=3)
+        with view:
+            pcb = parse_cached(cache, project_name, view,
+                               lambda: Board.from_protel_bin(project_name, view, version=3, jobs=jobs))
         pcb.to_kicad7(kpcb, kpcblib_path)
     elif s == "PCB 4.0 Binary File":
         print("convert_pcb bin 4.0")
-        pcb = Board.from_protel_bin(project_name, ppcb)
+        with view:
+            pcb = parse_cached(cache, project_name, view,
+                               lambda: Board.from_protel_bin(project_name, view, jobs=jobs))
         pcb.to_kicad7(kpcb, kpcblib_path)
     else:
         # May be an ASCII file
+        def parse_ascii ():
+            if hasattr(ppcb, "seek"):
+                ppcb.seek(0)
+                return Board.from_protel_ascii(project_name, ppcb, jobs=jobs)
+            return Board.from_protel_ascii(project_name, io.BytesIO(ppcb), jobs=jobs)
+
         print("convert_pcb ascii")
-        pcb = Board.from_protel_ascii(project_name, ppcb)
+        with view:
+            pcb = parse_cached(cache, project_name, view, parse_ascii)
         pcb.to_kicad7(kpcb, kpcblib_path)
 
     pro = KicadProject()
@@ -55,48 +90,485 @@ def convert_pcb (project_name, ppcb, kpcb, kpcblib_path, kpro):
     pro.to_kicad7(kpro)
 
 
-def convert_sch (project_name, psch, ksch, klib, klibpower):
-    # See if file starts with known header of binary SCH file
-    header = protel_read_string(psch)
-    if header == "Protel for Windows - Schematic Capture Binary File Version 1.2 - 2.0":
-        print("convert_sch bin 1.2-2.0")
-        sch = Schematic.from_protel_bin(project_name, psch)
-        sch.to_kicad7(ksch, klib, klibpower)
-    else:
-        print("convert_sch ascii")
-        print("  SCH ASCII NOT YET IMPLEMENTED!")
-        #convert_sch_ascii(psch, ksch, klib)
-        pass
-    return
+def convert_sch (project_name, psch, ksch, klib, klibpower, cache=None, images=None,
+                 directory=""):
+    # Returns the schematic (None if the format is not supported)
+    sch = None
+    with BinaryReader(psch) as reader:
+        # See if file starts with known header of binary SCH file
+        header = reader.string8()
+        if header == "Protel for Windows - Schematic Capture Binary File Version 1.2 - 2.0":
+            print("convert_sch bin 1.2-2.0")
+            sch = parse_cached(cache, project_name, reader,
+                               lambda: Schematic.from_protel_bin(project_name, reader))
+            sch.to_kicad7(ksch, klib, klibpower, images, directory)
+        else:
+            print("convert_sch ascii")
+            print("  SCH ASCII NOT YET IMPLEMENTED!")
+            #convert_sch_ascii(psch, ksch, klib)
+            pass
+    return sch
 
 
-def convert_lib (filename, plib, kschlib_path, kpcblib_path):
-    header = protel_read_string(plib)
-    if header == "Protel for Windows - Schematic Library Editor Binary File Version 1.2 - 2.0":
-        print("convert_lib bin 1.2-2.0")
-        kschlib = open(kschlib_path, "w+")
-        lib = SchematicLibrary.from_protel_bin(filename, plib)
-        lib.to_kicad7(kschlib)
-    elif header == "PCB 3.0 Binary Library File":
-        print("convert_pcblib bin 3.0")
-        print("  PCBLIB NOT YET IMPLEMENTED!")
-    elif header == "PCB 4.0 Binary Library File":
-        print("convert_pcblib bin 4.0")
-        print("  PCBLIB NOT YET IMPLEMENTED!")
-        #kpcblib = open(kpcblib_path, "w+")
-        #convert_pcblib_bin(filename, plib, kpcblib)
-    else:
-        print("unsupported format")
-        pass
+def convert_lib (filename, plib, kschlib_path, kpcblib_path, cache=None):
+    with BinaryReader(plib) as reader:
+        header = reader.string8()
+        if header == "Protel for Windows - Schematic Library Editor Binary File Version 1.2 - 2.0":
+            print("convert_lib bin 1.2-2.0")
+            lib = parse_cached(cache, filename, reader,
+                               lambda: SchematicLibrary.from_protel_bin(filename, reader))
+            with KicadWriter.open(kschlib_path) as kschlib:
+                lib.to_kicad7(kschlib)
+        elif header == "PCB 3.0 Binary Library File":
+            print("convert_pcblib bin 3.0")
+            print("  PCBLIB NOT YET IMPLEMENTED!")
+        elif header == "PCB 4.0 Binary Library File":
+            print("convert_pcblib bin 4.0")
+            print("  PCBLIB NOT YET IMPLEMENTED!")
+            #kpcblib = open(kpcblib_path, "w+")
+            #convert_pcblib_bin(filename, plib, kpcblib)
+        else:
+            print("unsupported format")
+            pass
     return
 
 
+# Columns of the 'Items' table that make up the folder tree of a database
+DDB_TREE_COLUMNS = ("ItemID", "ParentID", "Name")
+
+
+def strip_mdb_json_binary (line):
+    # Replace the binary values ({"$binary": "<base64>"}) of a line printed
+    # by mdb-json by null. Base64 text holds no quotes, so a value ends at
+    # the next quote.
+    parts = []
+    start = 0
+    while True:
+        found = line.find(b'"$binary"', start)
+        if found < 0:
+            break
+        value = line.find(b'"', found + 9)
+        end = line.find(b'}', line.find(b'"', value + 1)) + 1
+        parts.append(line[start:line.rfind(b'{', start, found)])
+        parts.append(b"null")
+        start = end
+    if not parts:
+        return line
+    parts.append(line[start:])
+    return b"".join(parts)
+
+
+def parse_mdb_json_item (line, columns=None):
+    # Entry of the 'Items' table from a line printed by mdb-json (None for
+    # empty lines), as returned by read_ddb_items(). If the content is not
+    # wanted, it is cut from the line before parsing, so that the base64
+    # text of large documents is not decoded just to read the names.
+    if not line.strip():
+        return None
+    if (columns is not None) and ("Data" not in columns):
+        line = strip_mdb_json_binary(line)
+    j = json.loads(line)
+    row = {"ItemID": j.get("ItemID"), "ParentID": j.get("ParentID"), "Name": j["Name"]}
+    if (columns is None) or ("Data" in columns):
+        data = j.get("Data")
+        if data is not None:
+            data = base64.b64decode(data["$binary"])
+        row["Data"] = data
+    return row
+
+
+def read_ddb_items_mdbtools (name_infile, columns=None):
+    # Fallback for databases the built-in reader does not support.
+    # mdb-json prints one JSON formatted table line per entry, with the
+    # content as base64 encoded binary data in "Data/$binary". The lines
+    # are read from the pipe as they arrive, so only one document is held
+    # in memory at a time.
+    with subprocess.Popen(["mdb-json", name_infile, "Items"],
+                          stdout=subprocess.PIPE) as mdb:
+        for line in mdb.stdout:
+            row = parse_mdb_json_item(line, columns)
+            if row is not None:
+                yield row
+
+    if mdb.returncode != 0:
+        print(f"  mdb-json failed (exit status {mdb.returncode})")
+
+
+def open_ddb (name_infile):
+    # DDB files are Jet 4 databases, which are read directly. Returns None
+    # if the database must be read with mdb-json.
+    try:
+        return JetDatabase.open(name_infile)
+    except RuntimeError as e:
+        print(f"  {e}, using mdb-json")
+        return None
+
+
+def read_ddb_items (name_infile, db, columns=None):
+    # Entries of the 'Items' table of a database as dicts: ItemID, ParentID,
+    # Name and Data (content as bytes, None if empty), or only the given
+    # 'columns'. 'db' is the database returned by open_ddb().
+    if db is None:
+        yield from read_ddb_items_mdbtools(name_infile, columns)
+        return
+
+    for row in db.iter_rows("Items", columns):
+        if row.get("Name") is not None:
+            yield row
+
+
+def get_ddb_item_paths (name_infile, db):
+    # Path of every item in the 'Documents' folder of a database, relative
+    # to that folder (ItemID -> path). If there is no 'Documents' folder,
+    # paths are relative to the root.
+    #
+    # Items refer to their folder by ParentID. The parent -> children index
+    # is built in a single pass that leaves out the content of the items,
+    # then the tree is walked once from the top.
+    names = {}
+    children = {}
+    for row in read_ddb_items(name_infile, db, DDB_TREE_COLUMNS):
+        # Names come from the database, keep them inside their folder
+        name = row["Name"].replace("/", "_").replace("\\", "_")
+        if name in ("", ".", ".."):
+            name = "_"
+        names[row["ItemID"]] = name
+        children.setdefault(row["ParentID"], []).append(row["ItemID"])
+
+    top = [item for parent, items in children.items() if parent not in names
+           for item in items]
+    stack = [(item, "") for item in top]
+    for item in top:
+        if names[item].upper() == "DOCUMENTS":
+            stack = [(child, "") for child in children.get(item, [])]
+            break
+
+    paths = {}
+    while stack:
+        item, folder = stack.pop()
+        if item in paths:
+            continue
+        paths[item] = os.path.join(folder, names[item])
+        for child in children.get(item, []):
+            stack.append((child, paths[item]))
+    return paths
+
+
+def extract_ddb (name_infile, db_dir, contents=None, digests=None):
+    # Check database file and extract schematic/PCB/library into 'db_dir'.
+    # Returns the paths of the extracted design files.
+    #
+    # With a 'contents' dict, nothing is written. The content of each file
+    # is stored in the dict under the path it would have in 'db_dir'.
+    #
+    # Every extracted file is hashed once. The hashes are stored in
+    # 'digests' (path -> hash), if given. Files whose content is unchanged
+    # since the last extraction are not written again (see ItemRecord).
+    #
+    # All database documents are listed as entries in the 'Items' table.
+    # The folders of the 'Documents' folder are created below 'db_dir',
+    # items in other folders (e.g. 'Recycle Bin') are not extracted.
+    #
+    # If the built-in reader fails on the database, the extraction is done
+    # again with mdb-json. Files extracted up to the error are written
+    # again (or found unchanged).
+    db = open_ddb(name_infile)
+    if db is not None:
+        try:
+            with db:
+                return extract_ddb_items(name_infile, db, db_dir, contents, digests)
+        except READ_ERRORS as e:
+            print(f"  error reading database ({type(e).__name__}: {e}), using mdb-json")
+    return extract_ddb_items(name_infile, None, db_dir, contents, digests)
+
+
+def extract_ddb_items (name_infile, db, db_dir, contents, digests):
+    paths = get_ddb_item_paths(name_infile, db)
+    folders = set()
+    record = None
+    unchanged = 0
+    if contents is None:
+        os.makedirs(db_dir, exist_ok=True)
+        record = ItemRecord(db_dir)
+
+    documents = []
+    # Extract all sch/pcb/lib and add to the list. The content is read in
+    # a second pass, one item at a time.
+    for row in read_ddb_items(name_infile, db):
+        item_path = paths.get(row["ItemID"], None)
+        if item_path is None:
+            continue
+        name, ext = os.path.splitext(item_path)
+        ext = ext.upper()
+        data = row.get("Data", None)
+        # Design files and image files
+        if ext in ('.SCH', '.PCB', '.LIB', '.PRJ', '.JPG', '.PNG'):
+            path = os.path.join(db_dir, item_path)
+            content = b"" if data is None else data
+            digest = hash_data(content)
+            if digests is not None:
+                digests[path] = digest
+            if contents is not None:
+                contents[path] = content
+            elif record.is_current(item_path, digest):
+                unchanged += 1
+            else:
+                folder = os.path.dirname(path)
+                if folder not in folders:
+                    os.makedirs(folder, exist_ok=True)
+                    folders.add(folder)
+                with open(path, "wb+") as f:
+                    f.write(content)
+            if record is not None:
+                record.record(item_path, digest, len(content))
+            if (data is not None) and (ext not in ('.JPG', '.PNG')):
+                documents.append(path)
+
+    if record is not None:
+        record.save()
+        if unchanged:
+            print(f"  {unchanged} unchanged file(s) not written again")
+    return documents
+
+
+def index_images (contents):
+    # Images held in memory, by folder: folder -> {path -> content}
+    images = {}
+    for path, data in contents.items():
+        if os.path.splitext(path)[1].upper() in ('.JPG', '.PNG'):
+            images.setdefault(os.path.dirname(path), {})[path] = data
+    return images
+
+
+def in_memory_document (name_infile, contents, images):
+    # Returns (content, images in its folder) of a document held in memory,
+    # (None, None) for documents that are read from disk
+    if (contents is None) or (name_infile not in contents):
+        return None, None
+    return contents[name_infile], images.get(os.path.dirname(name_infile), {})
+
+
+def open_document (name_infile, data=None):
+    if data is not None:
+        return contextlib.nullcontext(data)
+    return open(name_infile, "rb")
+
+
+def document_names (documents):
+    # Output name of each document: its file name without extension.
+    # Documents with the same name in different folders (e.g. of a .DDB)
+    # would overwrite each other's output files. For them, the path of
+    # their folder below the common folder is appended, e.g. 'x_A' and
+    # 'x_B' for 'A/x.pcb' and 'B/x.pcb'. Returns document -> output name.
+    folders = {}
+    for name in documents:
+        filename = os.path.splitext(os.path.basename(name))[0]
+        folders.setdefault(filename, set()).add(os.path.dirname(os.path.abspath(name)))
+
+    names = {}
+    for name in documents:
+        filename = os.path.splitext(os.path.basename(name))[0]
+        if len(folders[filename]) > 1:
+            common = os.path.commonpath(list(folders[filename]))
+            folder = os.path.relpath(os.path.dirname(os.path.abspath(name)), common)
+            if folder != os.curdir:
+                filename += "_" + folder.replace(os.sep, "_")
+        names[name] = filename
+    return names
+
+
+def document_outputs (name_infile, filename=None):
+    # Output files of a design document (None for other files). 'filename'
+    # is the output name (see document_names()), by default the name of
+    # the document.
+    basename = os.path.basename(name_infile)
+    name, fileext = os.path.splitext(basename)
+    if filename is None:
+        filename = name
+    fileext = fileext.upper()
+
+    if fileext == '.LIB':
+        return [os.path.join("kicad", filename + "_export.kicad_sym")]
+    if (fileext == '.SCH') or (fileext == '.PRJ'):
+        return ["kicad/" + filename + ".kicad_sch",
+                "kicad/" + filename + "_export.kicad_sym",
+                "kicad/" + filename + "_export_power.kicad_sym"]
+    if fileext == '.PCB':
+        return ["kicad/" + filename + ".kicad_pcb",
+                "kicad/" + filename + ".kicad_pro"]
+    return None
+
+
+def document_groups (documents, names):
+    # Documents that write a common output file (e.g. 'x.lib' and 'x.sch'
+    # both create 'x_export.kicad_sym'), directly or through other
+    # documents, form a group. A group is skipped or converted as a unit,
+    # in the order of 'documents', so that the shared output is always the
+    # one of the last writer. Returns the groups, in the order of their
+    # first document.
+    parent = list(range(len(documents)))
+
+    def find (i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    writers = {}                        # Output -> first document writing it
+    for i, name in enumerate(documents):
+        for path in document_outputs(name, names[name]):
+            j = writers.setdefault(os.path.normpath(path), i)
+            parent[find(i)] = find(j)
+
+    groups = {}
+    for i, name in enumerate(documents):
+        groups.setdefault(find(i), []).append(name)
+    return list(groups.values())
+
+
+def record_group (manifest, converted):
+    # Register the converted documents of a group, [(name, outputs,
+    # depends), ...]. Called after the last document of the group, so that
+    # shared outputs are hashed in their final state.
+    for name, outputs, depends in converted:
+        manifest.record(name, outputs, depends)
+
+
+def convert_document (name_infile, cache=None, data=None, images=None, jobs=1, filename=None):
+    # Convert a LIB, SCH or PCB file. Returns other files the output
+    # depends on (images of a schematic).
+    #
+    # 'data' and 'images' are given for documents held in memory (see
+    # in_memory_document()), otherwise the file is read from disk. 'jobs'
+    # is the number of processes used to decode a PCB. 'filename' is the
+    # output name (see document_names()).
+    basename = os.path.basename(name_infile)
+    name, fileext = os.path.splitext(basename)
+    if filename is None:
+        filename = name
+    outputs = document_outputs(name_infile, filename)
+    depends = []
+
+    print("processing", name_infile)
+    if fileext.upper() == '.LIB':
+        with open_document(name_infile, data) as plib:
+            kpcblib_path = os.path.join("kicad", filename + "_export_pcb.pretty")
+            convert_lib(filename, plib, outputs[0], kpcblib_path, cache)
+
+    if (fileext.upper() == '.SCH') or (fileext.upper() == '.PRJ'):
+        # Images in memory are looked up by file name (Protel names are
+        # not case sensitive)
+        image_data = None
+        image_paths = {}
+        if images is not None:
+            image_paths = {os.path.basename(path).upper(): path for path in images}
+            image_data = {name: images[path] for name, path in image_paths.items()}
+
+        folder = os.path.dirname(name_infile)
+        with open_document(name_infile, data) as psch:
+            with KicadWriter.open(outputs[0]) as ksch, \
+                 KicadWriter.open(outputs[1]) as klib, \
+                 KicadWriter.open(outputs[2]) as klibpower:
+                sch = convert_sch(filename, psch, ksch, klib, klibpower, cache, image_data,
+                                  folder)
+        if sch is not None:
+            depends = sch.get_image_files(folder)
+            if images is not None:
+                depends = [image_paths.get(os.path.basename(path).upper(), path)
+                           for path in depends]
+
+    if fileext.upper() == '.PCB':
+        kpcblib_path = os.path.join("kicad", filename + "_export_pcb.pretty")
+        with open_document(name_infile, data) as ppcb:
+            with KicadWriter.open(outputs[0]) as kpcb, \
+                 KicadWriter.open(outputs[1]) as kpro:
+                convert_pcb(filename, ppcb, kpcb, kpcblib_path, kpro, cache, jobs)
+
+    return depends
+
+
+def convert_document_job (name_infile, filename, cache_path, cache_size, data=None, images=None):
+    # Run convert_document() in a worker process. The console output is
+    # returned with the result, so that it can be printed in one piece.
+    # Returns (output, depends, error).
+    output = io.StringIO()
+    depends = []
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            cache = None
+            if cache_path is not None:
+                cache = ModelCache(cache_path, cache_size)
+            depends = convert_document(name_infile, cache, data, images, filename=filename)
+        except Exception:
+            error = traceback.format_exc()
+    return output.getvalue(), depends, error
+
+
+def convert_documents_parallel (groups, names, jobs, cache_path, cache_size, manifest,
+                                contents=None, images=None):
+    # Convert document groups (see document_groups()) in a pool of worker
+    # processes, with their output names 'names'. The documents of a group
+    # are converted one after the other, in the order given, different
+    # groups are independent. Documents held in memory are passed to the
+    # workers with their images. Returns the documents that failed.
+    failed = []
+    waiting = [list(group) for group in groups]
+    converted = [[] for group in groups]
+    running = {}
+
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=worker_init) as executor:
+        def submit (index):
+            name = waiting[index].pop(0)
+            future = executor.submit(convert_document_job, name, names[name],
+                                     cache_path, cache_size,
+                                     *in_memory_document(name, contents, images))
+            running[future] = index, name
+
+        for index in range(len(groups)):
+            submit(index)
+
+        while running:
+            done, _ = concurrent.futures.wait(running,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index, name = running.pop(future)
+                output, depends, error = future.result()
+                print(output, end="")
+                if error is not None:
+                    print(error, end="")
+                    failed.append(name)
+                else:
+                    converted[index].append((name, document_outputs(name, names[name]), depends))
+                if waiting[index]:
+                    submit(index)
+                else:
+                    record_group(manifest, converted[index])
+
+    return failed
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description = 'Protel99SE to KiCAD7 Converter')
     parser.add_argument('protelfiles', nargs='*', help='Name of Protel99SE file(s) (sch, pcb, lib, ddb)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of documents converted in parallel, or of processes '
+                             'decoding a single PCB (default: %(default)s)')
+    parser.add_argument('--force', action='store_true',
+                        help='Convert all documents, even if they are unchanged since the last run')
+    parser.add_argument('--in-memory', action='store_true',
+                        help='Convert .DDB documents in memory, without extracting them into db/')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='Keep parsed documents in DIR and reuse them for unchanged input files')
+    parser.add_argument('--cache-size', metavar='MB', type=int, default=CACHE_SIZE >> 20,
+                        help='Size limit of the cache directory (default: %(default)s MB)')
     args = parser.parse_args()
 
+    cache = None
+    if args.cache is not None:
+        cache = ModelCache(args.cache, args.cache_size << 20)
+
     # Install Ctrl-C handler
     signal.signal(signal.SIGINT, sigint_handler)
 
@@ -106,7 +578,12 @@ if __name__ == "__main__":
     except FileExistsError:
         pass
 
-    # Inflate .DDB archives
+    # Inflate .DDB archives. In memory, the extracted files are only kept
+    # in 'contents' (path -> content). The hashes of all extracted files
+    # are kept in 'digests' for the manifest.
+    contents = {} if args.in_memory else None
+    digests = {}
+    ddb_documents = []
     for name_infile in args.protelfiles:
         # Check file extension for supported files
         basename = os.path.basename(name_infile)
@@ -115,70 +592,71 @@ if __name__ == "__main__":
         if fileext.upper() == '.DDB':
             print("processing", name_infile)
 
-            # Check database file and extract schematic/PCB/library
-            # All database documents are listed as entries in the 'Items' table.
             db_dir = os.path.join('db', filename)
-            try:
-                os.makedirs(db_dir)
-            except FileExistsError:
-                pass
-            result = subprocess.run(["mdb-json", name_infile, "Items"],
-                                    stdout=subprocess.PIPE)
-            # Put all JSON formatted table lines in a list
-            docs = result.stdout.decode("utf-8").splitlines()
-
-            # TODO: Extract all files in the database
-            # Extract all sch/pcb/lib and add to the list.
-            # Those files have their content stored as base64 encoded binary
-            # data in "Data/$binary"
-            for d in docs:
-                j = json.loads(d)
-                name, ext = os.path.splitext(j["Name"])
-                # Design files
-                if (ext.upper() == '.SCH') or (ext.upper() == '.PCB') or (ext.upper() == '.LIB') or (ext.upper() == '.PRJ'):
-                    with open(os.path.join(db_dir, j["Name"]), "wb+") as f:
-                        data = j.get("Data")
-                        if data is not None:
-                            f.write(base64.b64decode(j["Data"]["$binary"]))
-                            args.protelfiles.append(os.path.join(db_dir, j["Name"]))
-                # Image files
-                if (ext.upper() == '.JPG') or (ext.upper() == '.PNG'):
-                    with open(os.path.join(db_dir, j["Name"]), "wb+") as f:
-                        data = j.get("Data")
-                        if data is not None:
-                            f.write(base64.b64decode(j["Data"]["$binary"]))
-
-    # LIB/SCH files
-    for name_infile in args.protelfiles:
-        # Check file extension for supported files
-        basename = os.path.basename(name_infile)
-        filename, fileext = os.path.splitext(basename)
+            ddb_documents += extract_ddb(name_infile, db_dir, contents, digests)
+    args.protelfiles += ddb_documents
 
-        if fileext.upper() == '.LIB':
-            print("processing", name_infile)
-            with open(name_infile, "rb") as plib:
-                kschlib_path = os.path.join("kicad", filename + "_export.kicad_sym")
-                kpcblib_path = os.path.join("kicad", filename + "_export_pcb.pretty")
-                convert_lib(filename, plib, kschlib_path, kpcblib_path)
+    # Design documents, LIB/SCH files first
+    documents = [name for name in args.protelfiles
+                 if os.path.splitext(name)[1].upper() in ('.LIB', '.SCH', '.PRJ')]
+    documents += [name for name in args.protelfiles
+                  if os.path.splitext(name)[1].upper() == '.PCB']
 
-        if (fileext.upper() == '.SCH') or (fileext.upper() == '.PRJ'):
-            print("processing", name_infile)
-            with open(name_infile, "rb") as psch:
-                ksch = open("kicad/" + filename + ".kicad_sch", "w+")
-                klib = open("kicad/" + filename + "_export.kicad_sym", "w+")
-                klibpower = open("kicad/" + filename + "_export_power.kicad_sym", "w+")
-                convert_sch(filename, psch, ksch, klib, klibpower)
+    # Documents that are unchanged since the last run (same input, same
+    # converter, outputs still intact) are skipped. Documents with shared
+    # outputs are only skipped together.
+    manifest = Manifest('kicad', digests)
+    names = document_names(documents)
+    for name_infile in documents:
+        filename = os.path.splitext(os.path.basename(name_infile))[0]
+        if names[name_infile] != filename:
+            print(f"  {name_infile}: same name as a document in another folder, "
+                  f"output named {names[name_infile]}")
+    groups = document_groups(documents, names)
+    skipped = []
+    if not args.force:
+        changed = []
+        for group in groups:
+            if all(manifest.is_current(name_infile,
+                                       document_outputs(name_infile, names[name_infile]))
+                   for name_infile in group):
+                for name_infile in group:
+                    print("skipping", name_infile, "(unchanged)")
+                skipped += group
+            else:
+                changed.append(group)
+        groups = changed
 
-    # PCB files
-    for name_infile in args.protelfiles:
-        # Check file extension for supported files
-        basename = os.path.basename(name_infile)
-        filename, fileext = os.path.splitext(basename)
+    images = index_images(contents) if contents is not None else {}
+    failed = []
+    try:
+        # Several groups of documents are converted in parallel. A single
+        # group gets the processes for itself (decoding the sections of a PCB).
+        if (args.jobs > 1) and (len(groups) > 1):
+            failed = convert_documents_parallel(groups, names, args.jobs, args.cache,
+                                                args.cache_size << 20, manifest,
+                                                contents, images)
+        else:
+            for group in groups:
+                converted = []
+                for name_infile in group:
+                    data, folder_images = in_memory_document(name_infile, contents, images)
+                    depends = convert_document(name_infile, cache, data, folder_images,
+                                               args.jobs, names[name_infile])
+                    outputs = document_outputs(name_infile, names[name_infile])
+                    converted.append((name_infile, outputs, depends))
+                record_group(manifest, converted)
+    finally:
+        # Also keep what was converted before an error or Ctrl-C
+        manifest.save()
 
-        if fileext.upper() == '.PCB':
-            print("processing", name_infile)
-            with open(name_infile, "rb") as ppcb:
-                kpcb = open("kicad/" + filename + ".kicad_pcb", "w+")
-                kpcblib_path = os.path.join("kicad", filename + "_export_pcb.pretty")
-                kpro = open("kicad/" + filename + ".kicad_pro", "w+")
-                convert_pcb(filename, ppcb, kpcb, kpcblib_path, kpro)
+    if skipped:
+        print(f"skipped {len(skipped)} unchanged document(s):")
+        for name_infile in skipped:
+            print("  ", name_infile)
+
+    if failed:
+        print(f"conversion failed for {len(failed)} document(s):")
+        for name_infile in failed:
+            print("  ", name_infile)
+        sys.exit(1)
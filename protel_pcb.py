@@ -1,27 +1,16 @@
 #!/usr/bin/python3
 
+import array
+import collections
+import concurrent.futures
 import math
-from protel_primitive import ProtelString
+from protel_reader import BinaryReader, real48, real48_column, string8_at
 import re
 import struct
 import uuid
 
 
 
-class ProtelString16:
-    def __init__ (self, bin_file):
-        self.s = ""
-        length = struct.unpack('<H', bin_file.read(2))[0]
-        if length > 0:
-            bytestring = bin_file.read(length)
-            self.s = bytestring.decode("iso8859_15").replace("\"","'")
-            if self.s.endswith('\x00'):
-                self.s = self.s[:-1]
-
-    def get (self):
-        return self.s
-
-
 def pointrotate(xcenter, ycenter, x, y, angle):
     dx = x - xcenter
     dy = y - ycenter
@@ -34,15 +23,36 @@ def pointrotate(xcenter, ycenter, x, y, angle):
     return xnew, ynew
 
 
-def protel_read_string (f):
-    s = ""
-
-    length = f.read(1)[0]
-    if length > 0:
-        bytestring = f.read(length)
-        s = bytestring.decode("iso8859_15")
-
-    return s
+# Record layouts of the fixed-size sections in binary PCB files.
+# A layout covers the leading part of a record up to the last field that is
+# decoded. The element size stored in the section header may be larger, the
+# remaining bytes are skipped. String fields (string8) are decoded
+# separately from their offset in the record, real48 fields of the bulk
+# sections column by column (real48_column).
+NET_V3 = struct.Struct('<2xBxh8xii')                   # layer, id, x, y
+COMPONENT_V3 = struct.Struct('<2xBxH33xii262x6s')       # layer, id, x, y, rotation
+COMPONENT_V4 = struct.Struct('<2xBxH33xii262x6s')       # layer, id, x, y, rotation
+DIMENSION = struct.Struct('<2xB3x4ix8iB3xB')            # layer, bbox, x1...textwidth, font, unitstyle
+ARC_V3 = struct.Struct('<2xBxh2xh4xiii12xi')            # layer, net, comp, x, y, r, width
+ARC_V4 = struct.Struct('<2xBxh5xhh4xiii12xi')           # layer, net, poly, comp, x, y, r, width
+PAD_V3 = struct.Struct('<2xBxh2xh4x8iiB13xB')           # layer, net, comp, x, y, sizes, hole, shape, plated
+PAD_V4 = struct.Struct('<2xBxh7xh4x8iiB29xB')           # layer, net, comp, x, y, sizes, hole, shape, plated
+VIA_V3 = struct.Struct('<4xh8xiiIIxBB')                 # net, x, y, diameter, hole, start, end
+VIA_V4 = struct.Struct('<4xh13xiiIIBB')                 # net, x, y, diameter, hole, start, end
+TRACK_V3 = struct.Struct('<2xBxh2xh4x5i')               # layer, net, comp, x1, y1, x2, y2, width
+TRACK_V4 = struct.Struct('<2xBxh5xhh4x5ih')             # layer, net, poly, comp, x1, y1, x2, y2, width, subpoly
+TEXT_V3 = struct.Struct('<2xBx4xh4xiii265xiBB')         # layer, comp, x, y, height, width, comment, designator
+TEXT_V4 = struct.Struct('<2xB10xh4xiii265xiBB')         # layer, comp, x, y, height, width, comment, designator
+FILL_V4 = struct.Struct('<2xB10xh4x4i')                 # layer, comp, x1, y1, x2, y2
+POLYGON_VERTEX = struct.Struct('<Biiii12xi')            # kind, vx, vy, cx, cy, radius
+
+
+def iter_records (data, layout, element_size):
+    # Decode the leading part of every record in a section buffer
+    if element_size == layout.size:
+        return layout.iter_unpack(data)
+    return (layout.unpack_from(data, offset)
+            for offset in range(0, len(data) - element_size + 1, element_size))
 
 
 class Layers:
@@ -51,6 +61,17 @@ class Layers:
         self.d = [{"id":0, "name":""}]
         self.stack = []
         self.num_copper_layers = 0
+        self.build_tables()
+
+    def build_tables (self):
+        # Lookup tables for layer names and KiCad translations. They must be
+        # rebuilt whenever the layer list or the stack changes.
+        self.by_name = {}
+        for layer in self.d:
+            self.by_name.setdefault(layer["name"], layer)
+        # Translations are added on first use, by name and by layer ID
+        self.translations = {}
+        self.id_translations = {}
 
     def init_default_v3 (self, board):
         self.d.append({"id":1, "name":"TopLayer"})
@@ -92,6 +113,7 @@ class Layers:
         self.stack = [{"protel":"TopLayer", "type":"signal", "kicad":"F.Cu", "kicad_num":0},
                       {"protel":"BottomLayer", "type":"signal", "kicad":"B.Cu", "kicad_num":31}]
         self.num_copper_layers = len(self.stack)
+        self.build_tables()
 
     def to_mm (self, mils):
         if type(mils) == str:
@@ -102,10 +124,7 @@ class Layers:
         return mils * 0.0254
 
     def get_layer_by_name (self, name):
-        for layer in self.d:
-            if layer["name"] == name:
-                return layer
-        return None
+        return self.by_name.get(name, None)
 
     # Height of layer stackup (copper + dielectric)
     def get_total_height (self):
@@ -202,6 +221,8 @@ class Layers:
         #    if layer["id"] > 0:
         #        print(f"{layer['id']} = {layer['name']}")
 
+        self.build_tables()
+
     def get_name (self, layer_number):
         if layer_number <= len(self.d):
             name = self.d[layer_number]["name"]
@@ -210,6 +231,23 @@ class Layers:
         return name
 
     def translate (self, layer):
+        # Translate a Protel layer (name, or layer ID from a binary file) to
+        # a list of KiCad layer specs. The result is computed once per layer
+        # and must not be modified by the caller.
+        if type(layer) == int:
+            klayer = self.id_translations.get(layer, None)
+            if klayer is None:
+                klayer = self.translate(self.get_name(layer))
+                self.id_translations[layer] = klayer
+            return klayer
+
+        klayer = self.translations.get(layer, None)
+        if klayer is None:
+            klayer = self.translate_name(layer)
+            self.translations[layer] = klayer
+        return klayer
+
+    def translate_name (self, layer):
         # TODO Make these translations configurable
         if layer == "Board-Outline":
             layer = "Mechanical1"
@@ -308,14 +346,439 @@ class Layers:
         return klayer
 
 
+class Record:
+    '''
+    Base class of the primitive records. Every record type has a fixed set
+    of fields (__slots__). Fields that a file does not provide are None.
+
+    KEYS maps the field names of Protel ASCII records to the attributes.
+    Values from ASCII files are kept as strings (e.g. "12.5mil"), values
+    from binary files are numbers (mils, degrees). Net numbers are always
+    integers (Protel net ID, the KiCad net ID is one higher).
+    '''
+    __slots__ = ()
+    KEYS = {}
+
+    @classmethod
+    def from_ascii (cls, rec):
+        prim = cls()
+        keys = cls.KEYS
+        for key, value in rec.items():
+            name = keys.get(key, None)
+            if name is not None:
+                setattr(prim, name, value)
+        if "NET" in rec and "NET" in keys:
+            prim.net = int(rec["NET"])
+        return prim
+
+    # Records decoded in worker processes are pickled as a plain tuple of
+    # their fields, which is much cheaper to load than the default state.
+    def __getstate__ (self):
+        return tuple(map(self.__getattribute__, self.__slots__))
+
+    def __setstate__ (self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__ (self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Track (Record):
+    __slots__ = ("layer", "net", "component", "polygon", "x1", "y1", "x2", "y2", "width",
+                 "subpolyindex")
+    KEYS = {"LAYER":"layer", "NET":"net", "COMPONENT":"component", "POLYGON":"polygon",
+            "X1":"x1", "Y1":"y1", "X2":"x2", "Y2":"y2", "WIDTH":"width",
+            "SUBPOLYINDEX":"subpolyindex"}
+
+    def __init__ (self):
+        self.layer = None
+        self.net = None
+        self.component = None
+        self.polygon = None
+        self.x1 = None
+        self.y1 = None
+        self.x2 = None
+        self.y2 = None
+        self.width = None
+        self.subpolyindex = 0
+
+
+class Arc (Record):
+    __slots__ = ("layer", "net", "component", "polygon", "x", "y", "radius",
+                 "start_angle", "end_angle", "width")
+    KEYS = {"LAYER":"layer", "NET":"net", "COMPONENT":"component", "POLYGON":"polygon",
+            "LOCATION.X":"x", "LOCATION.Y":"y", "RADIUS":"radius",
+            "STARTANGLE":"start_angle", "ENDANGLE":"end_angle", "WIDTH":"width"}
+
+    def __init__ (self):
+        self.layer = None
+        self.net = None
+        self.component = None
+        self.polygon = None
+        self.x = None
+        self.y = None
+        self.radius = None
+        self.start_angle = None
+        self.end_angle = None
+        self.width = None
+
+
+class Pad (Record):
+    '''
+    Pads have either a simple size (xsize/ysize/shape), or a size for each
+    layer of the pad stack (top_.../mid_.../bot_...).
+    '''
+    __slots__ = ("layer", "net", "component", "name", "x", "y", "xsize", "ysize",
+                 "top_xsize", "top_ysize", "mid_xsize", "mid_ysize", "bot_xsize", "bot_ysize",
+                 "shape", "top_shape", "holesize", "rotation", "plated", "soldermask_override")
+    KEYS = {"LAYER":"layer", "NET":"net", "COMPONENT":"component", "NAME":"name",
+            "X":"x", "Y":"y", "XSIZE":"xsize", "YSIZE":"ysize",
+            "TOPXSIZE":"top_xsize", "TOPYSIZE":"top_ysize", "MIDXSIZE":"mid_xsize",
+            "MIDYSIZE":"mid_ysize", "BOTXSIZE":"bot_xsize", "BOTYSIZE":"bot_ysize",
+            "SHAPE":"shape", "TOPSHAPE":"top_shape", "HOLESIZE":"holesize",
+            "ROTATION":"rotation", "PLATED":"plated"}
+
+    def __init__ (self):
+        self.layer = None
+        self.net = None
+        self.component = None
+        self.name = ""
+        self.x = None
+        self.y = None
+        self.xsize = None
+        self.ysize = None
+        self.top_xsize = None
+        self.top_ysize = None
+        self.mid_xsize = None
+        self.mid_ysize = None
+        self.bot_xsize = None
+        self.bot_ysize = None
+        self.shape = None
+        self.top_shape = None
+        self.holesize = None
+        self.rotation = None
+        self.plated = None
+        self.soldermask_override = 0
+
+
+class Text (Record):
+    __slots__ = ("layer", "component", "x", "y", "height", "rotation", "width", "text",
+                 "comment", "designator")
+    KEYS = {"LAYER":"layer", "COMPONENT":"component", "X":"x", "Y":"y", "HEIGHT":"height",
+            "ROTATION":"rotation", "WIDTH":"width", "TEXT":"text",
+            "COMMENT":"comment", "DESIGNATOR":"designator"}
+
+    def __init__ (self):
+        self.layer = None
+        self.component = None
+        self.x = None
+        self.y = None
+        self.height = None
+        self.rotation = None
+        self.width = None
+        self.text = ""
+        self.comment = False
+        self.designator = False
+
+
+class Fill (Record):
+    __slots__ = ("layer", "component", "x1", "y1", "x2", "y2", "rotation", "keepout")
+    KEYS = {"LAYER":"layer", "COMPONENT":"component", "X1":"x1", "Y1":"y1", "X2":"x2",
+            "Y2":"y2", "ROTATION":"rotation"}
+
+    def __init__ (self):
+        self.layer = None
+        self.component = None
+        self.x1 = None
+        self.y1 = None
+        self.x2 = None
+        self.y2 = None
+        self.rotation = 0
+        self.keepout = False
+
+
+class Dimension (Record):
+    __slots__ = ("layer", "bbox_x1", "bbox_y1", "bbox_x2", "bbox_y2", "x1", "y1", "x2", "y2",
+                 "height", "line_width", "text_height", "text_width", "font", "unit_style")
+
+    def __init__ (self):
+        self.layer = None
+        self.bbox_x1 = None
+        self.bbox_y1 = None
+        self.bbox_x2 = None
+        self.bbox_y2 = None
+        self.x1 = None
+        self.y1 = None
+        self.x2 = None
+        self.y2 = None
+        self.height = None
+        self.line_width = None
+        self.text_height = None
+        self.text_width = None
+        self.font = None
+        self.unit_style = None
+
+
+class Polygon (Record):
+    '''
+    Polygon outline, stored column by column (one row per vertex).
+    Coordinates and radii are int32 in the native unit of binary files
+    (1e-4 mil).
+
+    kind:           Vertex kind (0 = line, otherwise arc)
+    x, y:           Vertex
+    cx, cy:         Arc center
+    start_angle:    Arc start angle (degrees)
+    end_angle:      Arc end angle (degrees)
+    radius:         Arc radius
+    '''
+    __slots__ = ("id", "layer", "net", "kind", "x", "y", "cx", "cy",
+                 "start_angle", "end_angle", "radius")
+    KEYS = {"ID":"id", "LAYER":"layer", "NET":"net"}
+
+    def __init__ (self):
+        self.id = None
+        self.layer = None
+        self.net = None
+        self.kind = array.array('B')
+        self.x = array.array('i')
+        self.y = array.array('i')
+        self.cx = array.array('i')
+        self.cy = array.array('i')
+        self.start_angle = array.array('d')
+        self.end_angle = array.array('d')
+        self.radius = array.array('i')
+
+    def __len__ (self):
+        return len(self.kind)
+
+    def add_vertex (self, kind, x, y, cx=0, cy=0, start_angle=0, end_angle=0, radius=0):
+        self.kind.append(kind)
+        self.x.append(x)
+        self.y.append(y)
+        self.cx.append(cx)
+        self.cy.append(cy)
+        self.start_angle.append(start_angle)
+        self.end_angle.append(end_angle)
+        self.radius.append(radius)
+
+    def add_vertices (self, data):
+        # Append a block of binary vertex records (POLYGON_VERTEX, 33 bytes)
+        stride = POLYGON_VERTEX.size
+        rows = list(POLYGON_VERTEX.iter_unpack(data[:stride * (len(data) // stride)]))
+        if rows:
+            kind, x, y, cx, cy, radius = zip(*rows)
+            self.kind.extend(kind)
+            self.x.extend(x)
+            self.y.extend(y)
+            self.cx.extend(cx)
+            self.cy.extend(cy)
+            self.radius.extend(radius)
+        self.start_angle.extend(real48_column(data, 17, stride))
+        self.end_angle.extend(real48_column(data, 23, stride))
+
+    @classmethod
+    def from_ascii (cls, rec):
+        poly = super().from_ascii(rec)
+        n = 0
+        while (f"VX{n}" in rec) and (f"VY{n}" in rec):
+            poly.add_vertex(int(rec.get(f"KIND{n}", "0")),
+                            to_units(rec[f"VX{n}"]), to_units(rec[f"VY{n}"]),
+                            to_units(rec.get(f"CX{n}", "0")), to_units(rec.get(f"CY{n}", "0")),
+                            float(rec.get(f"SA{n}", "0")), float(rec.get(f"EA{n}", "0")),
+                            to_units(rec.get(f"R{n}", "0")))
+            n += 1
+        return poly
+
+
+# Number of bytes read at a time from ASCII files. Each block is decoded on
+# its own (possibly in a worker process).
+ASCII_BLOCK_SIZE = 1 << 20
+
+
+def iter_ascii_blocks (file, block_size=ASCII_BLOCK_SIZE):
+    # Read an ASCII file in blocks of about 'block_size' bytes that end at
+    # a line end. Records never span lines, so blocks can be decoded
+    # independently.
+    rest = b""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        block = rest + block
+        end = block.rfind(b"\n") + 1
+        rest = block[end:]
+        if end > 0:
+            yield block[:end]
+    if rest:
+        yield rest
+
+
+def ascii_record_kind (line):
+    # Value of the RECORD field of an ASCII line, or None
+    start = line.find("|RECORD=")
+    if start < 0:
+        return None
+    start += 8
+    end = line.find("|", start)
+    return line[start:] if end < 0 else line[start:end]
+
+
+def ascii_fields (line):
+    # Key/value dict of an ASCII line. Fields that are not a single
+    # key=value pair are ignored.
+    rec = {}
+    for field in line.split('|'):
+        key_value = field.split('=')
+        if len(key_value) == 2:
+            rec[key_value[0]] = key_value[1]
+    return rec
+
+
+def to_units (mils):
+    # Convert a length in mils (number, or string from an ASCII file with
+    # optional "mil" suffix) to the native unit of binary files (1e-4 mil)
+    if type(mils) == str:
+        mils = mils.rstrip('\r\n')
+        if mils.endswith("mil"):
+            mils = mils[:-3]
+        mils = float(mils)
+    return round(mils * 1e4)
+
+
+class TrackStore:
+    '''
+    Net tracks and arcs of a board, stored column by column.
+    Coordinates, widths and radii are int32 in the native unit of binary
+    files (1e-4 mil). Layers are indices into layer_names.
+
+    kind:           TRACK or ARC
+    x1, y1:         Start point (track), center (arc)
+    x2, y2:         End point (track), radius and 0 (arc)
+    width:          Line width
+    layer:          Index into layer_names
+    net:            Protel net ID
+    polygon:        Protel polygon ID (-1 = none)
+    start_angle:    Arc start angle (degrees)
+    end_angle:      Arc end angle (degrees)
+    '''
+    TRACK = 0
+    ARC = 1
+
+    def __init__ (self):
+        self.kind = array.array('B')
+        self.x1 = array.array('i')
+        self.y1 = array.array('i')
+        self.x2 = array.array('i')
+        self.y2 = array.array('i')
+        self.width = array.array('i')
+        self.layer = array.array('B')
+        self.net = array.array('i')
+        self.polygon = array.array('i')
+        self.start_angle = array.array('d')
+        self.end_angle = array.array('d')
+        self.layer_names = []
+        self.layer_ids = {}
+
+    def __len__ (self):
+        return len(self.kind)
+
+    def layer_index (self, name):
+        index = self.layer_ids.get(name, None)
+        if index is None:
+            index = len(self.layer_names)
+            self.layer_names.append(name)
+            self.layer_ids[name] = index
+        return index
+
+    def add_track (self, layer, net, x1, y1, x2, y2, width, polygon=-1):
+        self.kind.append(self.TRACK)
+        self.x1.append(x1)
+        self.y1.append(y1)
+        self.x2.append(x2)
+        self.y2.append(y2)
+        self.width.append(width)
+        self.layer.append(self.layer_index(layer))
+        self.net.append(net)
+        self.polygon.append(polygon)
+        self.start_angle.append(0)
+        self.end_angle.append(0)
+
+    def add_arc (self, layer, net, x, y, radius, start_angle, end_angle, width, polygon=-1):
+        self.kind.append(self.ARC)
+        self.x1.append(x)
+        self.y1.append(y)
+        self.x2.append(radius)
+        self.y2.append(0)
+        self.width.append(width)
+        self.layer.append(self.layer_index(layer))
+        self.net.append(net)
+        self.polygon.append(polygon)
+        self.start_angle.append(start_angle)
+        self.end_angle.append(end_angle)
+
+    def extend (self, other):
+        # Append all rows of another store (e.g. decoded by a worker process)
+        remap = [self.layer_index(name) for name in other.layer_names]
+        if remap == list(range(len(remap))):
+            self.layer.extend(other.layer)
+        else:
+            self.layer.extend(remap[i] for i in other.layer)
+        for column in ("kind", "x1", "y1", "x2", "y2", "width", "net", "polygon",
+                       "start_angle", "end_angle"):
+            getattr(self, column).extend(getattr(other, column))
+
+
+class ViaStore:
+    '''
+    Vias of a board, stored column by column.
+    Coordinates and sizes are int32 in the native unit of binary files
+    (1e-4 mil).
+
+    x, y:           Location
+    diameter:       Pad diameter
+    holesize:       Drill diameter
+    net:            Protel net ID
+    start_layer:    Protel layer ID
+    end_layer:      Protel layer ID
+    '''
+    def __init__ (self):
+        self.x = array.array('i')
+        self.y = array.array('i')
+        self.diameter = array.array('i')
+        self.holesize = array.array('i')
+        self.net = array.array('i')
+        self.start_layer = array.array('B')
+        self.end_layer = array.array('B')
+
+    def __len__ (self):
+        return len(self.x)
+
+    def add (self, net, x, y, diameter, holesize, start_layer=0, end_layer=0):
+        self.x.append(x)
+        self.y.append(y)
+        self.diameter.append(diameter)
+        self.holesize.append(holesize)
+        self.net.append(net)
+        self.start_layer.append(start_layer)
+        self.end_layer.append(end_layer)
+
+    def extend (self, other):
+        for column in ("x", "y", "diameter", "holesize", "net", "start_layer", "end_layer"):
+            getattr(self, column).extend(getattr(other, column))
+
+
 class Board:
     def __init__ (self, filename, file):
         self.board = {}
-        self.fps = []
-        self.vias = []
+        self.fps = {}
+        self.vias = ViaStore()
         self.freepads = []
         self.nets = {0 : {"ID" : 0, "NAME" : ""}}
-        self.tracks = []
+        self.net_ids = {"" : 0}             # Net name -> KiCad net ID
+        self.tracks = TrackStore()
         self.polygons = {}
         self.freegraphics = []
         self.rules = []
@@ -324,9 +787,19 @@ class Board:
         self.layers = Layers()
         self.file = file
         self.offset = [0,0]
-        self.ps = ProtelString(file)
+        self.version = None
+        self.sections = []
+        self.loaded_sections = set()
         self.bounding_box = None
 
+    def __getstate__ (self):
+        # The reader is only needed while parsing. It is not part of a
+        # pickled board (e.g. in the model cache), so sections that were
+        # not loaded cannot be loaded later.
+        state = self.__dict__.copy()
+        state["file"] = None
+        return state
+
     def to_mm (self, mils):
         if type(mils) == str:
             mils = mils.rstrip('\r\n')
@@ -348,45 +821,29 @@ class Board:
         # Start at 12 o'clock and count clockwise
         return 90.0 - protel_angle
 
-    def ascii_to_dict (self, line):
-        fields = line.split('|')
-        rec = {}
-        for field in fields:
-            key_value = field.split('=')
-            if (len(key_value) == 2):
-                rec[key_value[0]] = key_value[1]
-        return rec
-
     def find_fp (self, id):
-        for i in range(len(self.fps)):
-            fp = self.fps[i]
-            if fp["id"] == id:
-                return i, fp
-    
-        fp = {"id":id, "prims":[]}
-        self.fps.append(fp)
-
-        return len(self.fps)-1, fp
-
-    def read_string (self, data, index):
-        s = ""
-        length = int(data[index])
-        if length > 0:
-            s = data[index+1:index+1+length].decode("iso8859_15")
-        s = s.replace("\"", "")
+        # Footprints are registered by component ID. The dict keeps the
+        # order in which components were first seen.
+        fp = self.fps.get(id, None)
+        if fp is None:
+            fp = {"id":id, "prims":[]}
+            self.fps[id] = fp
+
+        return fp
+
+    @staticmethod
+    def read_string (data, index):
+        # string8 field of a record
+        return string8_at(data, index).replace("\"", "")
+
+    @staticmethod
+    def read_string16 (reader):
+        # string16 record (ASCII key/value list)
+        s = reader.string16().replace("\"","'")
+        if s.endswith('\x00'):
+            s = s[:-1]
         return s
 
-    def read_float (self, raw):
-        f = struct.unpack('<I', raw[1:5])[0] / 4294967296.0
-        f = (f + int(raw[5] & 0x7F)) / 128.0 + 1
-        if raw[0] == 0:
-            f = 0
-        else:
-            f *= 2 ** (raw[0] - 129)
-            if (raw[5] & 0x80) != 0:
-                f = -f
-        return f
-
     def get_canvas_origin (self):
         x = self.board["ORIGINX"]
         y = self.board["ORIGINY"]
@@ -398,143 +855,186 @@ class Board:
         if len(self.tracks) == 0:
             self.offset = [0,0]
         else:
-            xmax = -1e12
-            ymax = -1e12
             xmin = 1e12
-            ymin = 1e12
-    
-            for t in self.tracks:
-                if t["RECORD"] == "Track":
-                    x1 = None
-
-                    x1 = self.to_mm(t['X1'])
-                    y1 = self.to_mm(t['Y1'])
-                    x2 = self.to_mm(t['X2'])
-                    y2 = self.to_mm(t['Y2'])
-
-                    xmax = max(xmax, x1)
-                    xmax = max(xmax, x2)
-                    ymax = max(ymax, y1)
-                    ymax = max(ymax, y2)
-                    xmin = min(xmin, x1)
-                    xmin = min(xmin, x2)
-                    ymin = min(ymin, y1)
-                    ymin = min(ymin, y2)
-    
+            ymax = -1e12
+
+            tracks = self.tracks
+            rows = [i for i, kind in enumerate(tracks.kind) if kind == TrackStore.TRACK]
+            if len(rows) > 0:
+                xmin = self.to_mm(min(min(tracks.x1[i], tracks.x2[i]) for i in rows) / 1e4)
+                ymax = self.to_mm(max(max(tracks.y1[i], tracks.y2[i]) for i in rows) / 1e4)
+
             self.offset = [-xmin, ymax]
 
+    def column_to_mm (self, column):
+        # Convert a whole column in native units (1e-4 mil) to mm
+        return [v / 1e4 * 0.0254 for v in column]
+
+    def columns_to_points (self, xcolumn, ycolumn):
+        # Same as to_point(), for whole columns in native units (1e-4 mil)
+        xoffset = self.offset[0]
+        y0 = 40 + self.offset[1]
+        xs = [40 + v / 1e4 * 0.0254 + xoffset for v in xcolumn]
+        ys = [y0 - v / 1e4 * 0.0254 for v in ycolumn]
+        return xs, ys
+
+    def add_net (self, netid, rec):
+        # 'netid' is the KiCad net ID (Protel net ID + 1). If two nets share
+        # a name, lookups by name return the first one.
+        self.nets[netid] = rec
+        self.net_ids.setdefault(rec.get("NAME", ""), netid)
+
     def get_netid_by_name (self, name):
-        netid = 0
-        for id, prim in self.nets.items():
-            if name == prim['NAME']:
-                netid = id
-                break
-        return netid
+        # Returns the KiCad net ID, or 0 (no net) for unknown names
+        return self.net_ids.get(name, 0)
 
     @classmethod
-    def from_protel_ascii (cls, filename, ppcb):
+    def from_protel_ascii (cls, filename, ppcb, jobs=1):
+        # The file is decoded block by block (see decode_ascii_block()).
+        # With jobs > 1 the blocks are decoded in a pool of worker
+        # processes. Linking the records to footprints, nets and polygons
+        # happens here, in file order, so the result does not depend on the
+        # number of jobs.
         pcb = cls(filename, ppcb)
-
-        for line in ppcb:
-            fields = line.decode("iso8859-15").split('|')
-            rec = {}
-            for field in fields:
-                key_value = field.split('=')
-                if len(key_value) == 2:
-                    rec[key_value[0]] = key_value[1]
-    
-            if "RECORD" in rec:
-                record = rec["RECORD"]
-    
-                if record == "Arc":
-                    if "COMPONENT" in rec:
-                        pass   # ignore
-                    elif "POLYGON" in rec:
-                        pass   # ignore
-                    else:
-                        pcb.freegraphics.append(rec)
-    
-                if record == "Board":
-                    for key, value in rec.items():
-                        if (key != "RECORD"):
-                            pcb.board[key] = value
-    
-                if record == "Component":
-                    index, comp = pcb.find_fp(rec["ID"])
-                    comp["X"] = rec["X"]
-                    comp["Y"] = rec["Y"]
-                    comp["rotation"] = rec["ROTATION"]
-                    comp["numprims"] = rec["COUNT"]
-                    comp["layer"] = rec["LAYER"]
-                    comp["libref"] = rec["PATTERN"]
-                    pcb.fps[index] = comp
-
-                if (record == "Arc") or (record == "Fill") or (record == "Pad"):
-                    if "COMPONENT" in rec:
-                        index, comp = pcb.find_fp(rec["COMPONENT"])
-                        comp["prims"].append(rec)
-                        pcb.fps[index] = comp
-
-                if record == "Text":
-                    if "COMPONENT" in rec:
-                        index, comp = pcb.find_fp(rec["COMPONENT"])
-                        comp["prims"].append(rec)
-                        pcb.fps[index] = comp
-                    else:
-                        pcb.freegraphics.append(rec)
-
-                if record == "Fill":
-                    rec["KEEPOUT"] = "KEEPOUT" == rec.get("LAYER", "")
-                    rec["ROTATION"] = float(rec.get("ROTATION", "0"))
-                    if "COMPONENT" in rec:
-                        index, comp = pcb.find_fp(rec["COMPONENT"])
-                        comp["prims"].append(rec)
-                        pcb.fps[index] = comp
-                    else:
-                        pcb.freegraphics.append(rec)
-
-                if record == "Net":
-                    pcb.nets[int(rec["ID"]) + 1] = rec
-
-                if record == "Polygon":
-                    pcb.polygons[int(rec["ID"])] = rec
-
-                if record == "Track":
-                    if "NET" in rec:
-                        pcb.tracks.append(rec)
-                    elif "COMPONENT" in rec:
-                        index, comp = pcb.find_fp(rec["COMPONENT"])
-                        comp["prims"].append(rec)
-                        pcb.fps[index] = comp
-                    elif ("POLYGON" in rec):
-                        pass    # ignore
-                    else:
-                        pcb.freegraphics.append(rec)
-    
-                if record == "Via":
-                    pcb.vias.append(rec)
+        blocks = iter_ascii_blocks(ppcb)
+
+        if jobs > 1:
+            with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+                # Keep a few blocks in flight, not the whole file
+                pending = collections.deque()
+                for data in blocks:
+                    pending.append(executor.submit(decode_ascii_block, data))
+                    if len(pending) > 2 * jobs:
+                        pcb.link_ascii_records(*pending.popleft().result())
+                while pending:
+                    pcb.link_ascii_records(*pending.popleft().result())
+        else:
+            for data in blocks:
+                pcb.link_ascii_records(*decode_ascii_block(data))
 
         pcb.layers.init_from_board_dict(pcb.board)
         pcb.set_offset()
  
         return pcb
 
+    def link_ascii_records (self, records, tracks, vias):
+        # Place the records of a decoded ASCII block on the board. Component
+        # primitives go to their footprint, all others are free graphics.
+        # Net tracks and vias arrive in column stores.
+        self.tracks.extend(tracks)
+        self.vias.extend(vias)
+
+        for kind, prim in records:
+            if kind == "Board":
+                for key, value in prim.items():
+                    if (key != "RECORD"):
+                        self.board[key] = value
+            elif kind == "Component":
+                comp = self.find_fp(prim["ID"])
+                comp["X"] = prim["X"]
+                comp["Y"] = prim["Y"]
+                comp["rotation"] = prim["ROTATION"]
+                comp["numprims"] = prim["COUNT"]
+                comp["layer"] = prim["LAYER"]
+                comp["libref"] = prim["PATTERN"]
+            elif kind == "Net":
+                self.add_net(int(prim["ID"]) + 1, prim)
+            elif kind == "Polygon":
+                self.polygons[int(prim.id)] = prim
+            elif prim.component is not None:
+                self.find_fp(prim.component)["prims"].append(prim)
+            else:
+                self.freegraphics.append(prim)
+
     @classmethod
-    def from_protel_bin (cls, filename, ppcb, version=4):
+    def from_protel_bin (cls, filename, ppcb, version=4, sections=None, jobs=1):
+        # Only the sections named in 'sections' are decoded (all of them if
+        # None). More sections can be loaded later with load_sections() as
+        # long as the file is still open.
+        if not isinstance(ppcb, BinaryReader):
+            ppcb = BinaryReader(ppcb)
         pcb = cls(filename, ppcb)
+        pcb.version = version
+        pcb.read_section_directory()
+        pcb.load_sections(sections, jobs)
+
+        return pcb
 
+    def read_section_directory (self):
+        '''
+        Walk the linked list of sections without decoding any payload.
+
+        0...255:    Section name (string8)
+        256...257:  Element size
+        258...261:  Number of elements
+        262...265:  Offset of next section (0 = last section)
+        266...:     Elements
+        '''
+        self.sections = []
         section_offset = 0
         while True:
-            ppcb.seek(section_offset)
-    
-            section_name = pcb.ps()
-            ppcb.seek(section_offset + 256)
-    
-            section_element_size = struct.unpack('<H', ppcb.read(2))[0]
-            num_elements = struct.unpack('<I', ppcb.read(4))[0]
-            section_offset = struct.unpack('<I', ppcb.read(4))[0]
+            self.file.seek(section_offset)
+            section = {"NAME":self.file.string8(), "OFFSET":section_offset + 266}
+            self.file.seek(section_offset + 256)
+            section["ELEMENTSIZE"] = self.file.uint16()
+            section["COUNT"] = self.file.uint32()
+            section_offset = self.file.uint32()
+            self.sections.append(section)
+
+            # Go to next section
+            if section_offset == 0:
+                break
+
+        return self.sections
+
+    def load_sections (self, names=None, jobs=1):
+        # Decode the payload of the requested sections. The file header is
+        # always decoded, since it holds the layer setup.
+        # With jobs > 1 the bulk sections (see SECTION_DECODERS) are decoded
+        # in a pool of worker processes. Their records are still attached in
+        # file order, so the result does not depend on the number of jobs.
+        pcb = self
+        ppcb = self.file
+        version = self.version
+
+        selected = []
+        for section in self.sections:
+            section_name = section["NAME"]
+            if section["OFFSET"] in self.loaded_sections:
+                continue
+            if (names is not None) and (section_name not in names) and not section_name.endswith("Binary File"):
+                continue
+            selected.append(section)
+
+        executor = None
+        pending = {}
+
+        for index, section in enumerate(selected):
+            section_name = section["NAME"]
+            self.loaded_sections.add(section["OFFSET"])
+
+            ppcb.seek(section["OFFSET"])
+            section_element_size = section["ELEMENTSIZE"]
+            num_elements = section["COUNT"]
             #print(f"Section: {section_name}, size {section_element_size}, {num_elements} elements, @0x{ppcb.tell():X}")
 
+            if section_name in SECTION_DECODERS:
+                # The header precedes all bulk sections. Once it is decoded,
+                # hand all remaining bulk sections to the workers.
+                if (jobs > 1) and (executor is None):
+                    executor = concurrent.futures.ProcessPoolExecutor(jobs)
+                    pending = self.submit_sections(executor, selected[index:])
+
+                if section["OFFSET"] in pending:
+                    for future in pending[section["OFFSET"]]:
+                        records, store = future.result()
+                        self.attach_records(section_name, records, store)
+                else:
+                    data = ppcb.read(section_element_size * num_elements)
+                    records, store = SECTION_DECODERS[section_name](data, section_element_size, version, self.layers)
+                    self.attach_records(section_name, records, store)
+                continue
+
 
             if section_name == "PCB 3.0 Binary File":
                 '''
@@ -544,13 +1044,8 @@ class Board:
                 4...4+N-1:  String
                 '''
                 for i in range(num_elements):
-                    ppcb.read(2)
-                    length = struct.unpack('<H', ppcb.read(2))[0]
-                    fields = ppcb.read(length).decode("iso8859_15").split('|')
-                    for field in fields:
-                        key_value = field.split('=')
-                        if len(key_value) == 2:
-                            pcb.board[key_value[0]] = key_value[1]
+                    ppcb.skip(2)
+                    pcb.board.update(ascii_fields(ppcb.string16()))
                     pcb.board["ORIGINX"] = float(re.sub("[^0-9.]", "", pcb.board.get("ORIGINX", 0)))
                     pcb.board["ORIGINY"] = float(re.sub("[^0-9.]", "", pcb.board.get("ORIGINY", 0)))
                 #print(pcb.board)
@@ -565,13 +1060,9 @@ class Board:
                 4...4+N-1:  String
                 '''
                 for i in range(num_elements):
-                    ppcb.read(2)
-                    length = struct.unpack('<H', ppcb.read(2))[0]
-                    fields = ppcb.read(length).decode("iso8859_15").split('|')
-                    for field in fields:
-                        key_value = field.split('=')
-                        if len(key_value) == 2:
-                            pcb.board[key_value[0]] = key_value[1].strip()
+                    ppcb.skip(2)
+                    for key, value in ascii_fields(ppcb.string16()).items():
+                        pcb.board[key] = value.strip()
                     pcb.board["ORIGINX"] = float(re.sub("[^0-9.]", "", pcb.board.get("ORIGINX", 0)))
                     pcb.board["ORIGINY"] = float(re.sub("[^0-9.]", "", pcb.board.get("ORIGINY", 0)))
 
@@ -585,7 +1076,7 @@ class Board:
                 '''
                 for i in range(num_elements):
                     ppcb.read(2)
-                    rec = pcb.ascii_to_dict(ProtelString16(ppcb).get())
+                    rec = ascii_fields(pcb.read_string16(ppcb))
                     rec["RECORD"] = "Class"
                     pcb.classes.append(rec)
 
@@ -605,18 +1096,18 @@ class Board:
                     27...47:    Name (string8)
                     48:         ?
                     '''
+                    data = ppcb.read(section_element_size * num_elements)
                     for i in range(num_elements):
-                        netdef = ppcb.read(section_element_size)
+                        offset = i * section_element_size
+                        layer, id, x, y = NET_V3.unpack_from(data, offset)
                         net = {"RECORD":"Net"}
-                        #print(" ".join(f"{x:02X}" for x in netdef))
-                        net["layer"] = pcb.layers.get_name(netdef[2])
-                        id = struct.unpack('<H', netdef[4:6])[0]
-                        index, comp = pcb.find_fp(id)
-                        net["ID"] = struct.unpack('<h', netdef[4:6])[0]
-                        net["X"] = struct.unpack('<i', netdef[14:18])[0] / 1e4
-                        net["Y"] = struct.unpack('<i', netdef[18:22])[0] / 1e4
-                        net["NAME"] = pcb.read_string(netdef, 27)
-                        pcb.nets[1 + i] = net
+                        net["layer"] = pcb.layers.get_name(layer)
+                        pcb.find_fp(id & 0xFFFF)
+                        net["ID"] = id
+                        net["X"] = x / 1e4
+                        net["Y"] = y / 1e4
+                        net["NAME"] = pcb.read_string(data, offset + 27)
+                        pcb.add_net(1 + i, net)
 
                 if version == 4:
                     '''
@@ -627,10 +1118,10 @@ class Board:
                     '''
                     for i in range(num_elements):
                         ppcb.read(2)
-                        rec = pcb.ascii_to_dict(ProtelString16(ppcb).get())
+                        rec = ascii_fields(pcb.read_string16(ppcb))
                         rec["RECORD"] = "Net"
                         rec["ID"] = f"{i}"
-                        pcb.nets[1 + i] = rec
+                        pcb.add_net(1 + i, rec)
 
             if section_name == "Components":
                 if version == 3:
@@ -649,18 +1140,16 @@ class Board:
                     ?...:308    ?
                     309...314:  Rotation (float6)
                     '''
-                    for i in range(num_elements):
-                        compdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in compdef[0:80]))
-                        id = struct.unpack('<H', compdef[4:6])[0]
-                        index, comp = pcb.find_fp(id)
-                        comp["X"] = struct.unpack('<i', compdef[39:43])[0] / 1e4
-                        comp["Y"] = struct.unpack('<i', compdef[43:47])[0] / 1e4
-                        comp["rotation"] = pcb.read_float(compdef[309:315])
+                    data = ppcb.read(section_element_size * num_elements)
+                    for offset in range(0, len(data), section_element_size):
+                        layer, id, x, y, rotation = COMPONENT_V3.unpack_from(data, offset)
+                        comp = pcb.find_fp(id)
+                        comp["X"] = x / 1e4
+                        comp["Y"] = y / 1e4
+                        comp["rotation"] = real48(rotation)
                         comp["numprims"] = 0
-                        comp["layer"] = pcb.layers.get_name(int(compdef[2]))
-                        comp["libref"] = pcb.read_string(compdef, 47)
-                        pcb.fps[index] = comp
+                        comp["layer"] = pcb.layers.get_name(layer)
+                        comp["libref"] = pcb.read_string(data, offset + 47)
 
                 if version == 4:
                     '''
@@ -679,18 +1168,16 @@ class Board:
                     309...314:  Rotation (float6)
                     315...580:  ?
                     '''
-                    for i in range(num_elements):
-                        compdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in compdef[0:80]))
-                        id = struct.unpack('<H', compdef[4:6])[0]
-                        index, comp = pcb.find_fp(id)
-                        comp["X"] = struct.unpack('<i', compdef[39:43])[0] / 1e4
-                        comp["Y"] = struct.unpack('<i', compdef[43:47])[0] / 1e4
-                        comp["rotation"] = pcb.read_float(compdef[309:315])
+                    data = ppcb.read(section_element_size * num_elements)
+                    for offset in range(0, len(data), section_element_size):
+                        layer, id, x, y, rotation = COMPONENT_V4.unpack_from(data, offset)
+                        comp = pcb.find_fp(id)
+                        comp["X"] = x / 1e4
+                        comp["Y"] = y / 1e4
+                        comp["rotation"] = real48(rotation)
                         comp["numprims"] = 0
-                        comp["layer"] = pcb.layers.get_name(int(compdef[2]))
-                        comp["libref"] = pcb.read_string(compdef, 47)
-                        pcb.fps[index] = comp
+                        comp["layer"] = pcb.layers.get_name(layer)
+                        comp["libref"] = pcb.read_string(data, offset + 47)
     
             if section_name == "Polygons":
                 '''
@@ -725,25 +1212,16 @@ class Board:
                 for i in range(num_elements):
                     polydef = ppcb.read(section_element_size)
                     #print(" ".join(f"{x:02X}" for x in polydef))
-                    poly = {"RECORD":"Polygon"}
-                    poly["LAYER"] = pcb.layers.get_name(int(polydef[2]))
+                    poly = Polygon()
+                    poly.layer = pcb.layers.get_name(int(polydef[2]))
                     id = struct.unpack('<h', polydef[4:6])[0]
-                    poly["ID"] = f"{id}"
+                    poly.id = f"{id}"
                     netno = struct.unpack('<h', polydef[23:25])[0]
                     if netno != -1:
-                        poly["NET"] = netno
+                        poly.net = netno
 
                     N = struct.unpack('<H', polydef[43:45])[0]
-                    for n in range(N+1):
-                        vdef = ppcb.read(33)
-                        poly[f"KIND{n}"] = f"{vdef[0]}"
-                        poly[f"VX{n}"] = f"{struct.unpack('<i', vdef[1:5])[0] / 1e4}"
-                        poly[f"VY{n}"] = f"{struct.unpack('<i', vdef[5:9])[0] / 1e4}"
-                        poly[f"CX{n}"] = f"{struct.unpack('<i', vdef[9:13])[0] / 1e4}"
-                        poly[f"CY{n}"] = f"{struct.unpack('<i', vdef[13:17])[0] / 1e4}"
-                        poly[f"SA{n}"] = f"{pcb.read_float(vdef[17:23])}"
-                        poly[f"EA{n}"] = f"{pcb.read_float(vdef[23:29])}"
-                        poly[f"R{n}"] = f"{struct.unpack('<i', vdef[29:33])[0] / 1e4}"
+                    poly.add_vertices(ppcb.read(POLYGON_VERTEX.size * (N+1)))
 
                     pcb.polygons[f"{id}"] = poly
 
@@ -771,25 +1249,25 @@ class Board:
                 56...58:    ?
                 59:         Unit Style (0=None, 1=Normal, 2=Brackets)
                 '''
-                for i in range(num_elements):
-                    dimdef = ppcb.read(section_element_size)
-                    #print(" ".join(f"{x:02X}" for x in dimdef))
-                    dim = {"RECORD":"Dimension"}
-                    dim["LAYER"] = pcb.layers.get_name(dimdef[2])
-                    dim["BBOX_X1"] = struct.unpack('<i', dimdef[6:10])[0] / 1e4
-                    dim["BBOX_Y1"] = struct.unpack('<i', dimdef[10:14])[0] / 1e4
-                    dim["BBOX_X2"] = struct.unpack('<i', dimdef[14:18])[0] / 1e4
-                    dim["BBOX_Y2"] = struct.unpack('<i', dimdef[18:22])[0] / 1e4
-                    dim["X1"] = struct.unpack('<i', dimdef[23:27])[0] / 1e4
-                    dim["Y1"] = struct.unpack('<i', dimdef[27:31])[0] / 1e4
-                    dim["X2"] = struct.unpack('<i', dimdef[31:35])[0] / 1e4
-                    dim["Y2"] = struct.unpack('<i', dimdef[35:39])[0] / 1e4
-                    dim["HEIGHT"] = struct.unpack('<i', dimdef[39:43])[0] / 1e4
-                    dim["LINEWIDTH"] = struct.unpack('<i', dimdef[43:47])[0] / 1e4
-                    dim["TEXTHEIGHT"] = struct.unpack('<i', dimdef[47:51])[0] / 1e4
-                    dim["TEXTWIDTH"] = struct.unpack('<i', dimdef[51:55])[0] / 1e4
-                    dim["FONT"] = dimdef[55]
-                    dim["UNITSTYLE"] = dimdef[59]
+                data = ppcb.read(section_element_size * num_elements)
+                for (layer, bx1, by1, bx2, by2, x1, y1, x2, y2, height, line_width,
+                     text_height, text_width, font, unit_style) in iter_records(data, DIMENSION, section_element_size):
+                    dim = Dimension()
+                    dim.layer = pcb.layers.get_name(layer)
+                    dim.bbox_x1 = bx1 / 1e4
+                    dim.bbox_y1 = by1 / 1e4
+                    dim.bbox_x2 = bx2 / 1e4
+                    dim.bbox_y2 = by2 / 1e4
+                    dim.x1 = x1 / 1e4
+                    dim.y1 = y1 / 1e4
+                    dim.x2 = x2 / 1e4
+                    dim.y2 = y2 / 1e4
+                    dim.height = height / 1e4
+                    dim.line_width = line_width / 1e4
+                    dim.text_height = text_height / 1e4
+                    dim.text_width = text_width / 1e4
+                    dim.font = font
+                    dim.unit_style = unit_style
                     pcb.freegraphics.append(dim)
 
             if section_name == "Rules":
@@ -798,16 +1276,15 @@ class Board:
                 '''
                 for i in range(num_elements):
                     ppcb.read(2)
-                    rec = pcb.ascii_to_dict(ProtelString16(ppcb).get())
+                    rec = ascii_fields(pcb.read_string16(ppcb))
                     rec["RECORD"] = "Rule"
                     pcb.rules.append(rec)
 
             if section_name == "Embeddeds":
                 if version == 4:
-                    edef = bytearray()
-                    for i in range(num_elements):
-                        edef.extend(ppcb.read(section_element_size))
+                    # Not decoded yet. Hex dump for analysis:
                     '''
+                    edef = ppcb.read(section_element_size * num_elements)
                     for i in range(0,len(edef),16):
                         s = ""
                         for j in range(16):
@@ -820,614 +1297,69 @@ class Board:
                         print(f"{i:04X} ", " ".join(f"{x:02X}" for x in edef[i:i+16]), s)
                     '''
  
-            if section_name == "Arcs":
-                if version == 3:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...7:      ?
-                    8...9:      Component ID
-                    10...11:    ?
-                    12...13:    ?
-                    14...17:    Location.X
-                    18...21:    Location.Y
-                    22...25:    Radius
-                    26...31:    Start Angle (float6)
-                    32...37:    End Angle (float6)
-                    38...41:    Width
-                    42...43:    ?
-                    '''
-                    for i in range(num_elements):
-                        arcdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in arcdef))
-                        arc = {"RECORD":"Arc"}
-                        arc["LAYER"] = pcb.layers.get_name(int(arcdef[2]))
-                        netno = struct.unpack('<h', arcdef[4:6])[0]
-                        #polyno = struct.unpack('<h', arcdef[11:13])[0]
-                        #if polyno != -1:
-                        #    arc["POLYGON"] = polyno
-                        compno = struct.unpack('<h', arcdef[8:10])[0]
-                        if compno != -1:
-                            arc["COMPONENT"] = compno
-                        if netno != -1:
-                            arc["NET"] = netno
-                        arc["LOCATION.X"] = struct.unpack('<i', arcdef[14:18])[0] / 1e4
-                        arc["LOCATION.Y"] = struct.unpack('<i', arcdef[18:22])[0] / 1e4
-                        arc["RADIUS"] = struct.unpack('<i', arcdef[22:26])[0] / 1e4
-                        arc["STARTANGLE"] = pcb.read_float(arcdef[26:32])
-                        arc["ENDANGLE"] = pcb.read_float(arcdef[32:38])
-                        arc["WIDTH"] = struct.unpack('<i', arcdef[38:42])[0] / 1e4
-    
-                        if compno != -1:
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(arc)
-                            pcb.fps[index] = fp
-                        else:
-                            pass
-                            pcb.freegraphics.append(arc)
-
-                if version == 4:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...9:      ?
-                    10:         ?
-                    11...12:    Polygon ID
-                    13...14:    Component ID
-                    15...18:    ?
-                    19...22:    Location.X
-                    23...26:    Location.Y
-                    27...30:    Radius
-                    31...36:    Start Angle (float6)
-                    37...42:    End Angle (float6)
-                    43...46:    Width
-                    47...48:    ?
-                    '''
-                    for i in range(num_elements):
-                        arcdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in arcdef))
-                        arc = {"RECORD":"Arc"}
-                        netno = struct.unpack('<h', arcdef[4:6])[0]
-                        polyno = struct.unpack('<h', arcdef[11:13])[0]
-                        if polyno != -1:
-                            arc["POLYGON"] = polyno
-                        compno = struct.unpack('<h', arcdef[13:15])[0]
-                        if compno != -1:
-                            arc["COMPONENT"] = compno
-                        if netno != -1:
-                            arc["NET"] = netno
-                        arc["STARTANGLE"] = pcb.read_float(arcdef[31:37])
-                        arc["ENDANGLE"] = pcb.read_float(arcdef[37:43])
-                        arc["LOCATION.X"] = struct.unpack('<i', arcdef[19:23])[0] / 1e4
-                        arc["LOCATION.Y"] = struct.unpack('<i', arcdef[23:27])[0] / 1e4
-                        arc["RADIUS"] = struct.unpack('<i', arcdef[27:31])[0] / 1e4
-                        arc["WIDTH"] = struct.unpack('<i', arcdef[43:47])[0] / 1e4
-                        arc["LAYER"] = pcb.layers.get_name(int(arcdef[2]))
-    
-                        if netno != -1:
-                            pcb.tracks.append(arc)
-                        else:
-                            if compno != -1:
-                                index, fp = pcb.find_fp(compno)
-                                fp["prims"].append(arc)
-                                pcb.fps[index] = fp
-                            else:
-                                pcb.freegraphics.append(arc)
-
-            if section_name == "Pads":
-                if version == 3:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...7:      ?
-                    8...9:      Component ID
-                    10...11:    ?
-                    12...13:    ?
-                    14...17:    X
-                    18...21:    Y
-                    22...25:    XSIZE (no padstack: all layers,
-                                       padstack: Top layer)
-                    26...29:    YSIZE (no padstack: all layers,
-                                       padstack: Top layer)
-                    30...33:    XSIZE (only padstack: Mid layer)
-                    34...37:    YSIZE (only padstack: Mid layer)
-                    38...41:    XSIZE (only padstack: Bottom layer)
-                    42...45:    YSIZE (only padstack: Bottom layer)
-                    46...49:    Holesize
-                    50:         Padshape (Top layer) (1=round, 2=rect, 3=octa)
-                    51:         Padshape (Inner layers)
-                    52:         Padshape (Bottom layer)
-                    53...57:    Name (string8, max. 4 (sic!) characters)
-                    58...63:    Rotation (float6)
-                    64:         Plated?
-                    65...66:    ?
-                    67...88:    ?
-                    89...92:    ?
-                    93...100:   ?
-                    '''
-                    for i in range(num_elements):
-                        paddef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in paddef[0:80]))
-                        pad = {"RECORD":"Pad"}
-                        pad["LAYER"] = pcb.layers.get_name(paddef[2])
-                        netno = struct.unpack('<h', paddef[4:6])[0]
-                        if netno != -1:
-                            pad["NET"] = netno
-                        pad["X"] = struct.unpack('<i', paddef[14:18])[0] / 1e4
-                        pad["Y"] = struct.unpack('<i', paddef[18:22])[0] / 1e4
-                        xtop = struct.unpack('<i', paddef[22:26])[0] / 1e4
-                        ytop = struct.unpack('<i', paddef[26:30])[0] / 1e4
-                        xmid = struct.unpack('<i', paddef[30:34])[0] / 1e4
-                        ymid = struct.unpack('<i', paddef[34:38])[0] / 1e4
-                        xbot = struct.unpack('<i', paddef[38:42])[0] / 1e4
-                        ybot = struct.unpack('<i', paddef[42:46])[0] / 1e4
-                        stack = (xtop != xmid) or (xtop != xbot) or \
-                                (ytop != ymid) or (ytop != ybot)
-                        if stack:
-                            pad["TOPXSIZE"] = xtop
-                            pad["TOPYSIZE"] = ytop
-                            pad["MIDXSIZE"] = xmid
-                            pad["MIDYSIZE"] = ymid
-                            pad["BOTXSIZE"] = xbot
-                            pad["BOTYSIZE"] = ybot
-                        else:
-                            pad["XSIZE"] = xtop
-                            pad["YSIZE"] = ytop
-                        pad["ROTATION"] = pcb.read_float(paddef[58:64])
-                        shape = "RECTANGLE" if paddef[50] == 2 else "ROUND"
-                        pad["SHAPE"] = "OCTAGONAL" if paddef[50] == 2 else shape
-                        pad["PLATED"] = "FALSE" if paddef[64] == 0 else "TRUE"
-                        pad["HOLESIZE"] = struct.unpack('<i', paddef[46:50])[0] / 1e4
-                        pad["NAME"] = pcb.read_string(paddef, 53)
-                        compno = struct.unpack('<h', paddef[8:10])[0]
-                        pad["COMPONENT"] = compno
-                        if compno != -1:
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(pad)
-                            pcb.fps[index] = fp
-                        else:
-                            # Convert free pads to vias
-                            via = {}
-                            if netno != -1:
-                                via["NET"] = netno
-                            via["X"] = pad["X"]
-                            via["Y"] = pad["Y"]
-                            via["HOLESIZE"] = pad["HOLESIZE"]
-                            via["DIAMETER"] = pad["XSIZE"]
-                            pcb.vias.append(via)
-
-                if version == 4:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...7:      ?
-                    8:          Tenting (0/1)
-                    9:          ?
-                    10:         Keepout (0/1)
-                    11...12:    ?
-                    13...14:    Component ID
-                    15...18:    ?
-                    19...22:    X
-                    23...26:    Y
-                    27...30:    XSIZE (no padstack: all layers,
-                                       padstack: Top layer)
-                    31...34:    YSIZE (no padstack: all layers,
-                                       padstack: Top layer)
-                    35...38:    XSIZE (only padstack: Mid layer)
-                    39...42:    YSIZE (only padstack: Mid layer)
-                    43...46:    XSIZE (only padstack: Bottom layer)
-                    47...50:    YSIZE (only padstack: Bottom layer)
-                    51...54:    Holesize
-                    55:         Padshape (Top layer) (1=round, 2=rect, 3=octa)
-                    56:         Padshape (Inner layers)
-                    57:         Padshape (Bottom layer)
-                    58...78:    Name (string8, max. 20 characters)
-                    79...84:    Rotation (float6)
-                    85:         Plated (0/1)
-                    86:         Electrical type (0=Load, 1=Terminator, 2=Source)
-                    87...105:   ?
-                    106...109:  Paste Maske Override value
-                    110...113:  Solder Mask Override value
-                    114...120:  ?
-                    121:        Paste Mask Override (1=no, 2=yes)
-                    122:        Solder Mask Override (1=no, 2=yes)
-                    123...124:  ?
-                    '''
-                    for i in range(num_elements):
-                        paddef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in paddef))
-                        pad = {"RECORD":"Pad"}
-                        pad["LAYER"] = pcb.layers.get_name(int(paddef[2]))
-                        netno = struct.unpack('<h', paddef[4:6])[0]
-                        if netno != -1:
-                            pad["NET"] = netno
-                        pad["X"] = struct.unpack('<i', paddef[19:23])[0] / 1e4
-                        pad["Y"] = struct.unpack('<i', paddef[23:27])[0] / 1e4
-                        xtop = struct.unpack('<i', paddef[27:31])[0] / 1e4
-                        ytop = struct.unpack('<i', paddef[31:35])[0] / 1e4
-                        xmid = struct.unpack('<i', paddef[35:39])[0] / 1e4
-                        ymid = struct.unpack('<i', paddef[39:43])[0] / 1e4
-                        xbot = struct.unpack('<i', paddef[43:47])[0] / 1e4
-                        ybot = struct.unpack('<i', paddef[47:51])[0] / 1e4
-                        stack = (xtop != xmid) or (xtop != xbot) or \
-                                (ytop != ymid) or (ytop != ybot)
-                        if stack:
-                            pad["TOPXSIZE"] = xtop
-                            pad["TOPYSIZE"] = ytop
-                            pad["MIDXSIZE"] = xmid
-                            pad["MIDYSIZE"] = ymid
-                            pad["BOTXSIZE"] = xbot
-                            pad["BOTYSIZE"] = ybot
-                        else:
-                            pad["XSIZE"] = xtop
-                            pad["YSIZE"] = ytop
-                        pad["ROTATION"] = pcb.read_float(paddef[79:85])
-                        shape = "RECTANGLE" if paddef[55] == 2 else "ROUND"
-                        pad["SHAPE"] = "OCTAGONAL" if paddef[55] == 2 else shape
-                        pad["PLATED"] = "FALSE" if paddef[85] == 0 else "TRUE"
-                        pad["HOLESIZE"] = struct.unpack('<i', paddef[51:55])[0] / 1e4
-                        pad["NAME"] = pcb.read_string(paddef, 58)
-                        compno = struct.unpack('<h', paddef[13:15])[0]
-                        pad["COMPONENT"] = compno
-                        if compno != -1:
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(pad)
-                            pcb.fps[index] = fp
-                        else:
-                            # Convert free pads to vias
-                            via = {}
-                            if netno != -1:
-                                via["NET"] = netno
-                            via["X"] = pad["X"]
-                            via["Y"] = pad["Y"]
-                            via["HOLESIZE"] = pad["HOLESIZE"]
-                            via["DIAMETER"] = pad["XSIZE"]
-                            pcb.vias.append(via)
-
+        if executor is not None:
+            executor.shutdown()
+
+        self.set_offset()
+
+    def submit_sections (self, executor, sections):
+        # Split the bulk sections into chunks of whole elements and submit
+        # them. Returns the futures of every section, in element order.
+        pending = {}
+        for section in sections:
+            decoder = SECTION_DECODERS.get(section["NAME"], None)
+            if decoder is None:
+                continue
+            element_size = section["ELEMENTSIZE"]
+            futures = []
+            for first in range(0, section["COUNT"], PARALLEL_CHUNK_SIZE):
+                count = min(PARALLEL_CHUNK_SIZE, section["COUNT"] - first)
+                self.file.seek(section["OFFSET"] + first * element_size)
+                data = bytes(self.file.read(count * element_size))
+                futures.append(executor.submit(decoder, data, element_size, self.version, self.layers))
+            pending[section["OFFSET"]] = futures
+
+        return pending
+
+    def attach_records (self, section_name, records, store=None):
+        # Place decoded records on the board. Component primitives go to
+        # their footprint, free pads are converted to vias. Net tracks, net
+        # arcs and vias arrive in column stores.
+        if store is not None:
             if section_name == "Vias":
-                if version == 3:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer (34=MULTILAYER)
-                    3:          ?
-                    4...5:      Net ID
-                    6...13:     ?
-                    14...17:    X
-                    18...21:    Y
-                    22...25:    Diameter
-                    26...29:    Hole Size
-                    30:         ?
-                    31:         Start Layer
-                    32:         End Layer
-                    '''
-                    for i in range(num_elements):
-                        viadef = ppcb.read(section_element_size)
-                        via = {}
-                        #print(" ".join(f"{x:02X}" for x in viadef))
-                        via["NET"] = struct.unpack('<h', viadef[4:6])[0]
-                        via["X"] = struct.unpack('<i', viadef[14:18])[0] / 1e4
-                        via["Y"] = struct.unpack('<i', viadef[18:22])[0] / 1e4
-                        via["DIAMETER"] = struct.unpack('<I', viadef[22:26])[0] / 1e4
-                        via["HOLESIZE"] = struct.unpack('<I', viadef[26:30])[0] / 1e4
-                        via["STARTLAYER"] = viadef[31]
-                        via["ENDLAYER"] = viadef[32]
-                        pcb.vias.append(via)
-
-                if version == 4:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer (74=MULTILAYER)
-                    3:          ?
-                    4...5:      Net ID
-                    6...18:     ?
-                    19...22:    X
-                    23...26:    Y
-                    27...30:    Diameter
-                    31...34:    Hole Size
-                    35:         Start Layer
-                    36:         End Layer
-                    37:         ?
-                    38...41:    CCW
-                    42...43:    CEN
-                    44...47:    CAG
-                    48...51:    CPC
-                    52...55:    CPR
-                    56...74:    ?
-                    '''
-                    for i in range(num_elements):
-                        viadef = ppcb.read(section_element_size)
-                        via = {}
-                        via["NET"] = struct.unpack('<h', viadef[4:6])[0]
-                        via["X"] = struct.unpack('<i', viadef[19:23])[0] / 1e4
-                        via["Y"] = struct.unpack('<i', viadef[23:27])[0] / 1e4
-                        via["DIAMETER"] = struct.unpack('<I', viadef[27:31])[0] / 1e4
-                        via["HOLESIZE"] = struct.unpack('<I', viadef[31:35])[0] / 1e4
-                        via["STARTLAYER"] = viadef[35]
-                        via["ENDLAYER"] = viadef[36]
-                        pcb.vias.append(via)
-
-            if section_name == "Tracks":
-                if version == 3:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...7:      ?
-                    8...9:      Component ID
-                    10...13:    ?
-                    14...17:    X1
-                    18...21:    Y1
-                    22...25:    X2
-                    26...29:    Y2
-                    30...33:    Width
-                    34...37:    ?
-                    '''
-                    for i in range(num_elements):
-                        trackdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in trackdef))
-                        track = {"RECORD":"Track"}
-                        netno = struct.unpack('<h', trackdef[4:6])[0]
-                        track["NET"] = netno
-                        track["LAYER"] = pcb.layers.get_name(trackdef[2])
-#                        polyno = struct.unpack('<h', trackdef[11:13])[0]
-#                        if polyno != -1:
-#                            track["POLYGON"] = polyno
-                        compno = struct.unpack('<h', trackdef[8:10])[0]
-                        track["COMPONENT"] = compno
-                        track["X1"] = struct.unpack('<i', trackdef[14:18])[0] / 1e4
-                        track["Y1"] = struct.unpack('<i', trackdef[18:22])[0] / 1e4
-                        track["X2"] = struct.unpack('<i', trackdef[22:26])[0] / 1e4
-                        track["Y2"] = struct.unpack('<i', trackdef[26:30])[0] / 1e4
-                        track["WIDTH"] = struct.unpack('<i', trackdef[30:34])[0] / 1e4
-                        track["SUBPOLYINDEX"] = 0
-    
-                        if netno != -1:
-                            pcb.tracks.append(track)
-                        elif compno != -1:
-                            if True:#track["LAYER"] == "MECHANICAL1":
-                                index, fp = pcb.find_fp(compno)
-                                fp["prims"].append(track)
-                                pcb.fps[index] = fp
-                        elif "POLYGON" in track:
-                            i = 1   # ignore
-                        else:
-                            pcb.freegraphics.append(track)
-
-                if version == 4:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      Net ID
-                    6...9:      ?
-                    10:         ?
-                    11...12:    Polygon ID
-                    13...14:    Component ID
-                    15...18:    ?
-                    19...22:    X1
-                    23...26:    Y1
-                    27...30:    X2
-                    31...34:    Y2
-                    35...38:    Width
-                    39...40:    Sub PolygonID
-                    '''
-                    for i in range(num_elements):
-                        trackdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in trackdef))
-                        track = {"RECORD":"Track"}
-                        netno = struct.unpack('<h', trackdef[4:6])[0]
-                        track["NET"] = netno
-                        track["LAYER"] = pcb.layers.get_name(int(trackdef[2]))
-                        polyno = struct.unpack('<h', trackdef[11:13])[0]
-                        if polyno != -1:
-                            track["POLYGON"] = polyno
-                        compno = struct.unpack('<h', trackdef[13:15])[0]
-                        track["COMPONENT"] = compno
-                        track["X1"] = struct.unpack('<i', trackdef[19:23])[0] / 1e4
-                        track["Y1"] = struct.unpack('<i', trackdef[23:27])[0] / 1e4
-                        track["X2"] = struct.unpack('<i', trackdef[27:31])[0] / 1e4
-                        track["Y2"] = struct.unpack('<i', trackdef[31:35])[0] / 1e4
-                        track["WIDTH"] = struct.unpack('<i', trackdef[35:39])[0] / 1e4
-                        track["SUBPOLYINDEX"] = struct.unpack('<h', trackdef[39:41])[0]
-    
-                        if netno != -1:
-                            pcb.tracks.append(track)
-                        elif compno != -1:
-                            if True:#track["LAYER"] == "MECHANICAL1":
-                                index, fp = pcb.find_fp(compno)
-                                fp["prims"].append(track)
-                                pcb.fps[index] = fp
-                        elif "POLYGON" in track:
-                            i = 1   # ignore
-                        else:
-                            pcb.freegraphics.append(track)
-
-            if section_name == "Texts":
-                if version == 3:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      ?
-                    6...7:      ?
-                    8...9:      Component ID
-                    10...11:    ?
-                    12...13:    ?
-                    14...17:    X
-                    18...21:    Y
-                    22...25:    Height
-                    26...27:    ?
-                    28...33:    Rotation (float6)
-                    34:         ?
-                    35...290:   Text (string8, max. 255 characters)
-                    291...294:  Width
-                    295:        Flag Comment (0/1)
-                    296:        Flag Designator (0/1)
-                    '''
-                    for i in range(num_elements):
-                        txtdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in txtdef[0:80]))
-                        #print("   ", " ".join(f"{x:02X}" for x in txtdef[220:297]))
-                        txt = {"RECORD":"Text"}
-                        txt["LAYER"] = pcb.layers.get_name(txtdef[2])
-                        compno = struct.unpack('<h', txtdef[8:10])[0]
-                        txt["HEIGHT"] = struct.unpack('<i', txtdef[22:26])[0] / 1e4
-                        txt["ROTATION"] = pcb.read_float(txtdef[28:34])
-                        txt["X"] = struct.unpack('<i', txtdef[14:18])[0] / 1e4
-                        txt["Y"] = struct.unpack('<i', txtdef[18:22])[0] / 1e4
-                        txt["TEXT"] = pcb.read_string(txtdef, 35)
-                        txt["WIDTH"] = struct.unpack('<i', txtdef[291:295])[0] / 1e4
-                        if txtdef[295] != 0:
-                            txt["COMMENT"] = "True"
-                        if txtdef[296] != 0:
-                            txt["DESIGNATOR"] = "True"
-                        if compno != -1:
-                            txt["COMPONENT"] = compno
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(txt)
-                            pcb.fps[index] = fp
-                        else:
-                            pcb.freegraphics.append(txt)
-
-                if version == 4:
-                    '''
-                    0:          ?
-                    1:          ?
-                    2:          Layer
-                    3:          ?
-                    4...5:      ?
-                    6...9:      ?
-                    10:         ?
-                    11...12:    ?
-                    13...14:    Component ID
-                    15...18:    ?
-                    19...22:    X
-                    23...26:    Y
-                    27...30:    Height
-                    31...32:    ?
-                    33...38:    Rotation (float6)
-                    39:         ?
-                    40...295:   Text (string8, max. 255 characters)
-                    296...299:  Width
-                    300:        Flag Comment (0/1)
-                    301:        Flag Designator (0/1)
-                    '''
-                    for i in range(num_elements):
-                        txtdef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in txtdef))
-                        txt = {"RECORD":"Text"}
-                        compno = struct.unpack('<h', txtdef[13:15])[0]
-                        txt["X"] = struct.unpack('<i', txtdef[19:23])[0] / 1e4
-                        txt["Y"] = struct.unpack('<i', txtdef[23:27])[0] / 1e4
-                        txt["HEIGHT"] = struct.unpack('<i', txtdef[27:31])[0] / 1e4
-                        txt["ROTATION"] = pcb.read_float(txtdef[33:39])
-                        txt["TEXT"] = pcb.read_string(txtdef, 40)
-                        txt["WIDTH"] = struct.unpack('<i', txtdef[296:300])[0] / 1e4
-    
-                        txt["LAYER"] = pcb.layers.get_name(int(txtdef[2]))
-                        if txtdef[300] != 0:
-                            txt["COMMENT"] = "True"
-                        if txtdef[301] != 0:
-                            txt["DESIGNATOR"] = "True"
-                        if compno != -1:
-                            txt["COMPONENT"] = compno
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(txt)
-                            pcb.fps[index] = fp
-                        else:
-                            pcb.freegraphics.append(txt)
-
-            if section_name == "Fills":
-                if version == 3:
-                    '''
-                    0:          Selection (0/1)
-                    1:          ?
-                    2:          Layer
-                    '''
-                    for i in range(num_elements):
-                        filldef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in filldef))
-                        fill = {"RECORD":"Fill"}
-                        '''
-                        fill["X1"] = struct.unpack('<i', filldef[19:23])[0] / 1e4
-                        fill["Y1"] = struct.unpack('<i', filldef[23:27])[0] / 1e4
-                        fill["X2"] = struct.unpack('<i', filldef[27:31])[0] / 1e4
-                        fill["Y2"] = struct.unpack('<i', filldef[31:35])[0] / 1e4
-                        fill["ROTATION"] = pcb.read_float(filldef[35:41])
-                        fill["LAYER"] = pcb.layers.get_name(int(filldef[2]))
-                        compno = struct.unpack('<h', filldef[13:15])[0]
-                        if compno != -1:
-                            fill["COMPONENT"] = compno
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(fill)
-                            pcb.fps[index] = fp
-                        else:
-                            pcb.freegraphics.append(fill)
-                        '''
-    
-                if version == 4:
-                    '''
-                    0:          Selection (0/1)
-                    1:          ?
-                    2:          Layer
-                    3:          Locked (0=locked, 1=unlocked)
-                    4...5:      Net ID
-                    6...9:      ?
-                    10:         Keepout (0/1)
-                    11...12:    ?
-                    13...14:    Component ID
-                    15...18:    ?
-                    19...22:    X1
-                    23...26:    Y1
-                    27...30:    X2
-                    31...34:    Y2
-                    35...40:    Rotation (float6)
-                    '''
-                    for i in range(num_elements):
-                        filldef = ppcb.read(section_element_size)
-                        #print(" ".join(f"{x:02X}" for x in filldef))
-                        fill = {"RECORD":"Fill"}
-                        fill["KEEPOUT"] = int(filldef[2]) == 56     # TODO
-                        fill["X1"] = struct.unpack('<i', filldef[19:23])[0] / 1e4
-                        fill["Y1"] = struct.unpack('<i', filldef[23:27])[0] / 1e4
-                        fill["X2"] = struct.unpack('<i', filldef[27:31])[0] / 1e4
-                        fill["Y2"] = struct.unpack('<i', filldef[31:35])[0] / 1e4
-                        fill["ROTATION"] = pcb.read_float(filldef[35:41])
-                        fill["LAYER"] = pcb.layers.get_name(int(filldef[2]))
-                        compno = struct.unpack('<h', filldef[13:15])[0]
-                        if compno != -1:
-                            fill["COMPONENT"] = compno
-                            index, fp = pcb.find_fp(compno)
-                            fp["prims"].append(fill)
-                            pcb.fps[index] = fp
-                        else:
-                            pcb.freegraphics.append(fill)
-    
-            # Go to next section
-            if section_offset == 0:
-                break
-
-        pcb.set_offset()
- 
-        return pcb
+                self.vias.extend(store)
+            else:
+                self.tracks.extend(store)
+
+        if section_name == "Pads":
+            for pad in records:
+                if pad.component is not None:
+                    fp = self.find_fp(pad.component)
+                    fp["prims"].append(pad)
+                else:
+                    # Convert free pads to vias. Vias without a net are
+                    # not exported.
+                    if pad.net is not None:
+                        self.vias.add(pad.net, to_units(pad.x), to_units(pad.y),
+                                      to_units(pad.xsize), to_units(pad.holesize))
+
+        if section_name == "Tracks":
+            for track in records:
+                if track.component is not None:
+                    fp = self.find_fp(track.component)
+                    fp["prims"].append(track)
+                elif track.polygon is not None:
+                    pass    # ignore
+                else:
+                    self.freegraphics.append(track)
+
+        if (section_name == "Arcs") or (section_name == "Texts") or (section_name == "Fills"):
+            for prim in records:
+                if prim.component is not None:
+                    fp = self.find_fp(prim.component)
+                    fp["prims"].append(prim)
+                else:
+                    self.freegraphics.append(prim)
 
     def to_kicad7 (self, kpcb, kpcblib_path):
         # Write KiCAD board
@@ -1526,7 +1458,7 @@ class Board:
         bx2 = -math.inf
         by2 = -math.inf
 
-        for fp in self.fps:
+        for fp in self.fps.values():
             if not "layer" in fp.keys():
                 continue
 
@@ -1539,18 +1471,18 @@ class Board:
             kpcb.write( '    (attr smd board_only)\n')
 
             for prim in fp["prims"]:
-                if prim["RECORD"] == "Arc":
-                    cx, cy = self.to_point(prim["LOCATION.X"], prim["LOCATION.Y"])
+                if isinstance(prim, Arc):
+                    cx, cy = self.to_point(prim.x, prim.y)
                     cx, cy = pointrotate(compx, compy, cx, cy, comprotation)
                     cx -= compx
                     cy -= compy
-                    r = self.to_mm(prim["RADIUS"])
+                    r = self.to_mm(prim.radius)
                     endx = cx + r
                     endy = cy
-                    width = self.to_mm(prim["WIDTH"])
-                    start_angle = (float(prim["ENDANGLE"]) - comprotation) % 360
-                    end_angle = (float(prim["STARTANGLE"]) - comprotation) % 360
-                    klayer = self.layers.translate(prim["LAYER"])[0]['layer']
+                    width = self.to_mm(prim.width)
+                    start_angle = (float(prim.end_angle) - comprotation) % 360
+                    end_angle = (float(prim.start_angle) - comprotation) % 360
+                    klayer = self.layers.translate(prim.layer)[0]['layer']
 
                     if start_angle == end_angle:
                         kpcb.write(f'    (fp_circle (center {cx:.3f} {cy:.3f}) (end {endx:.4f} {endy:.4f})\n')
@@ -1575,17 +1507,17 @@ class Board:
                             bx2 = max(x1 + compx, x2 + compx, x3 + compx, bx2)
                             by2 = max(y1 + compy, y2 + compy, y3 + compy, by2)
 
-                if prim["RECORD"] == "Text":
-                    if "DESIGNATOR" in prim:
-                        designator = prim["TEXT"]
-                        x, y = self.to_point(prim["X"], prim["Y"])
+                if isinstance(prim, Text):
+                    if prim.designator:
+                        designator = prim.text
+                        x, y = self.to_point(prim.x, prim.y)
                         x, y = pointrotate(compx, compy, x, y, comprotation)
                         x -= compx
                         y -= compy
-                        height = self.to_mm(prim["HEIGHT"])
-                        thick = self.to_mm(prim["WIDTH"])
+                        height = self.to_mm(prim.height)
+                        thick = self.to_mm(prim.width)
     
-                        trot = float(prim["ROTATION"])
+                        trot = float(prim.rotation)
                         tlayer = "F.Fab"
                         mirror = ""
                         if l == "B.Cu":
@@ -1600,16 +1532,16 @@ class Board:
                              "    )\n"
                              )
     
-                    if "COMMENT" in prim:
-                        comment = prim["TEXT"]
-                        x, y = self.to_point(prim["X"], prim["Y"])
+                    if prim.comment:
+                        comment = prim.text
+                        x, y = self.to_point(prim.x, prim.y)
                         x, y = pointrotate(compx, compy, x, y, comprotation)
                         x -= compx
                         y -= compy
-                        height = self.to_mm(prim["HEIGHT"])
-                        thick = self.to_mm(prim["WIDTH"])
+                        height = self.to_mm(prim.height)
+                        thick = self.to_mm(prim.width)
     
-                        trot = float(prim["ROTATION"])
+                        trot = float(prim.rotation)
                         tlayer = "F.Fab"
                         mirror = ""
                         if l == "B.Cu":
@@ -1624,18 +1556,18 @@ class Board:
                              '    )\n'
                              )
     
-                if prim["RECORD"] == "Track":
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
+                if isinstance(prim, Track):
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
                     x1, y1 = pointrotate(compx, compy, x1, y1, comprotation)
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
                     x2, y2 = pointrotate(compx, compy, x2, y2, comprotation)
                     x1 -= compx
                     y1 -= compy
                     x2 -= compx
                     y2 -= compy
-                    width = self.to_mm(prim["WIDTH"])
+                    width = self.to_mm(prim.width)
 
-                    ldef = self.layers.translate(prim["LAYER"])
+                    ldef = self.layers.translate(prim.layer)
                     layer = ldef[0]["layer"]
                     if (l == "B.Cu") and (len(ldef) >= 2):
                         layer = ldef[1]["layer"]
@@ -1648,11 +1580,11 @@ class Board:
                         bx2 = max(x1 + compx, x2 + compx, bx2)
                         by2 = max(y1 + compy, y2 + compy, by2)
 
-                if prim["RECORD"] == "Fill":
-                    fillrotation = float(prim["ROTATION"])
-                    klayers = self.layers.translate(prim["LAYER"])
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
+                if isinstance(prim, Fill):
+                    fillrotation = float(prim.rotation)
+                    klayers = self.layers.translate(prim.layer)
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
                     center_x, center_y = (x1 + x2) / 2, (y1 + y2) / 2
                     x1, y1 = pointrotate(center_x, center_y, x1, y1, fillrotation)
                     x2, y2 = pointrotate(center_x, center_y, x2, y2, fillrotation)
@@ -1671,74 +1603,74 @@ class Board:
                              )
 
             for prim in fp["prims"]:
-                if prim["RECORD"] == "Pad":
+                if isinstance(prim, Pad):
                     compname = "?"
-                    if prim.get("COMPONENT", None) is not None:
-                        n, fp = self.find_fp(prim["COMPONENT"])
-                        compname = fp["libref"]
+                    owner = self.fps.get(prim.component, None)
+                    if owner is not None:
+                        compname = owner.get("libref", "?")
 
                     # Detect Protel style fiducial.
                     # There seems to be this convention: A pad in the KeepOutLayer defines
                     # the solder mask opening, and the drill diameter value defines the
                     # SMD pad size in the middle.
-                    if prim["LAYER"] == "KeepOutLayer":
-                        prim["LAYER"] = "TopLayer" if l == "F.Cu" else "BottomLayer"
-                        prim["SOLDERMASK_OVERRIDE"] = prim["XSIZE"] / 2
-                        prim["XSIZE"] = prim["HOLESIZE"]
-                        prim["YSIZE"] = prim["HOLESIZE"]
-                        prim["HOLESIZE"] = 0
-                        prim["SHAPE"] = "ROUND"
-
-                    x, y = self.to_point(prim["X"], prim["Y"])
+                    if prim.layer == "KeepOutLayer":
+                        prim.layer = "TopLayer" if l == "F.Cu" else "BottomLayer"
+                        prim.soldermask_override = prim.xsize / 2
+                        prim.xsize = prim.holesize
+                        prim.ysize = prim.holesize
+                        prim.holesize = 0
+                        prim.shape = "ROUND"
+
+                    x, y = self.to_point(prim.x, prim.y)
                     x, y = pointrotate(compx, compy, x, y, comprotation)
                     x -= compx
                     y -= compy
-                    if prim.get("XSIZE", None) is not None:
-                        xsize = self.to_mm(prim["XSIZE"])
-                        ysize = self.to_mm(prim["YSIZE"])
+                    if prim.xsize is not None:
+                        xsize = self.to_mm(prim.xsize)
+                        ysize = self.to_mm(prim.ysize)
                     else:
                         #print(f"Unsupported pad stack in {compname} @({x:.3f},{y:.3f})")
-                        xsize = self.to_mm(prim["TOPXSIZE"])
-                        ysize = self.to_mm(prim["TOPYSIZE"])
-                    padrotation = float(prim["ROTATION"])
+                        xsize = self.to_mm(prim.top_xsize)
+                        ysize = self.to_mm(prim.top_ysize)
+                    padrotation = float(prim.rotation)
     
                     padshape = "rect"
                     padtype = "smd"
                     padlayers = "\"F.Cu\" \"F.Paste\" \"F.Mask\""
     
-                    if prim["LAYER"] == "MultiLayer":   # TODO
+                    if prim.layer == "MultiLayer":   # TODO
                         padtype = "thru_hole"
                         padlayers = "\"*.Cu\" \"*.Mask\""
-                        if prim["PLATED"] == "FALSE":
+                        if prim.plated == "FALSE":
                             padtype = "np_thru_hole"
                             padlayers = "\"*.Cu\" \"*.Mask\""
-                            if not "NET" in prim:
-                                prim["NAME"] = ""
-                    elif prim["LAYER"] == "BottomLayer":    # TODO
+                            if prim.net is None:
+                                prim.name = ""
+                    elif prim.layer == "BottomLayer":    # TODO
                         padlayers = "\"B.Cu\" \"B.Paste\" \"B.Mask\""
 
-                    if prim.get("SHAPE", None) is not None:
-                        shape = prim["SHAPE"]
+                    if prim.shape is not None:
+                        shape = prim.shape
                     else:
                         print(f"Unsupported pad stack in {compname} @({x:.3f},{y:.3f})")
-                        shape = prim["TOPSHAPE"]
+                        shape = prim.top_shape
                     if shape == "ROUND":
                         padshape = "circle"
                         if xsize != ysize:
                             padshape = "oval"
 
-                    size = self.to_mm(prim["HOLESIZE"])
+                    size = self.to_mm(prim.holesize)
                     paddrill = f"(drill {size:.2f})"
 
                     kpcb.write(
-                        f"    (pad \"{prim['NAME']}\" {padtype} {padshape} (at {x:.3f} {y:.3f}"
+                        f"    (pad \"{prim.name}\" {padtype} {padshape} (at {x:.3f} {y:.3f}"
                         f" {padrotation:.3f}) (size {xsize:.3f} {ysize:.3f}) {paddrill} (layers {padlayers})"
                         )
     
-                    if "NET" in prim:
-                        netid = int(prim["NET"]) + 1
+                    if prim.net is not None:
+                        netid = prim.net + 1
                         kpcb.write(f'\n      (net {netid} \"{self.nets[netid]["NAME"]}\")')
-                    soldermask_override = self.to_mm(prim.get("SOLDERMASK_OVERRIDE", 0))
+                    soldermask_override = self.to_mm(prim.soldermask_override)
                     if soldermask_override > 0:
                         kpcb.write(f'\n      (solder_mask_margin {soldermask_override})')
                     kpcb.write(')\n')
@@ -1749,15 +1681,15 @@ class Board:
         # ---------- Graphics ----------
 
         for prim in self.freegraphics:
-            klayers = self.layers.translate(prim["LAYER"])
+            klayers = self.layers.translate(prim.layer)
     
-            if prim["RECORD"] == "Track":
+            if isinstance(prim, Track):
                 for klayer in klayers:
-                    if not "POLYGON" in prim:
+                    if prim.polygon is None:
                         layer = klayer["layer"]
-                        x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                        x2, y2 = self.to_point(prim["X2"], prim["Y2"])
-                        width = self.to_mm(prim["WIDTH"])
+                        x1, y1 = self.to_point(prim.x1, prim.y1)
+                        x2, y2 = self.to_point(prim.x2, prim.y2)
+                        width = self.to_mm(prim.width)
                         kpcb.write(
                             f'  (gr_line (start {x1:.3f} {y1:.3f}) (end {x2:.3f} {y2:.3f})\n'
                             f'    (stroke (width {width:.3f}) (type solid)) (layer {layer}))\n'
@@ -1769,16 +1701,16 @@ class Board:
                         bx2 = max(x1, x2, bx2)
                         by2 = max(y1, y2, by2)
 
-            if prim["RECORD"] == "Arc":
-                if not "POLYGON" in prim:
-                    layer = self.layers.translate(prim["LAYER"])[0]["layer"]
+            if isinstance(prim, Arc):
+                if prim.polygon is None:
+                    layer = self.layers.translate(prim.layer)[0]["layer"]
 
-                    cx, cy = self.to_point(prim["LOCATION.X"], prim["LOCATION.Y"])
-                    r = self.to_mm(prim["RADIUS"])
-                    width = self.to_mm(prim["WIDTH"])
+                    cx, cy = self.to_point(prim.x, prim.y)
+                    r = self.to_mm(prim.radius)
+                    width = self.to_mm(prim.width)
 
-                    start_angle = float(prim["ENDANGLE"]) % 360
-                    end_angle = float(prim["STARTANGLE"]) % 360
+                    start_angle = float(prim.end_angle) % 360
+                    end_angle = float(prim.start_angle) % 360
 
                     if start_angle == end_angle:
                         endx = cx + r
@@ -1807,17 +1739,17 @@ class Board:
                         bx2 = max(x1, x2, x3, bx2)
                         by2 = max(y1, y2, y3, by2)
 
-            if prim["RECORD"] == "Text":
+            if isinstance(prim, Text):
                 for klayer in klayers:
                     layer = klayer["layer"]
                     mirror = klayer["mirror"]
-                    x, y = self.to_point(prim["X"], prim["Y"])
-                    text = prim["TEXT"]
-                    height = self.to_mm(prim["HEIGHT"])
-                    thick = self.to_mm(prim["WIDTH"])
+                    x, y = self.to_point(prim.x, prim.y)
+                    text = prim.text
+                    height = self.to_mm(prim.height)
+                    thick = self.to_mm(prim.width)
                     rotation = 0
-                    if "ROTATION" in prim:
-                        rotation = prim["ROTATION"]
+                    if prim.rotation is not None:
+                        rotation = prim.rotation
                     kpcb.write(
                         f'  (gr_text "{text}" (at {x:.3f} {y:.3f} {rotation}) (layer "{layer}")\n'
                         f'    (effects (font (size {height:.2f} {height:.2f}) (thickness {thick:.3f}))'
@@ -1825,16 +1757,16 @@ class Board:
                          '  )\n'
                          )
     
-            if prim["RECORD"] == "Fill":
+            if isinstance(prim, Fill):
                 for klayer in klayers:
                     layer = klayer["layer"]
                     mirror = klayer["mirror"]
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
 
                     # Keepouts will be defined later as zones
-                    if not prim["KEEPOUT"]:
-                        if prim["ROTATION"] == 0:
+                    if not prim.keepout:
+                        if prim.rotation == 0:
                             kpcb.write(
                                 f'  (gr_rect (start {x1:.3f} {y1:.3f}) (end {x2:.3f} {y2:.3f})\n'
                                 f'    (stroke (width 0.1) (type solid)) (fill solid) (layer "{layer}"))\n'
@@ -1843,7 +1775,7 @@ class Board:
                             # Rotate rectangle vertices
                             cx = (x1 + x2) / 2
                             cy = (y1 + y2) / 2
-                            angle = -prim["ROTATION"]
+                            angle = -prim.rotation
                             xa, ya = pointrotate(cx, cy, x1, y1, angle)
                             xb, yb = pointrotate(cx, cy, x2, y1, angle)
                             xc, yc = pointrotate(cx, cy, x2, y2, angle)
@@ -1859,13 +1791,13 @@ class Board:
                                 f'    (stroke (width 0.1) (type solid)) (fill solid) (layer "{layer}"))\n'
                                 )
 
-            if prim["RECORD"] == "Dimension":
+            if isinstance(prim, Dimension):
                 for klayer in klayers:
                     layer = klayer["layer"]
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
-                    line_width = self.to_mm(prim["LINEWIDTH"])
-                    unit_style = prim["UNITSTYLE"]
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
+                    line_width = self.to_mm(prim.line_width)
+                    unit_style = prim.unit_style
 
                     kpcb.write(
                         f'  (dimension (type aligned) (layer "{layer}")\n'
@@ -1887,14 +1819,23 @@ class Board:
         # ---------- Tracks ----------
 
         # Segments
-        for prim in self.tracks:
-            if prim["RECORD"] == "Track":
-                track = prim
-                x1, y1 = self.to_point(track["X1"], track["Y1"])
-                x2, y2 = self.to_point(track["X2"], track["Y2"])
-                layer = self.layers.translate(track["LAYER"])[0]["layer"]
-                width = self.to_mm(track["WIDTH"])
-                netno = 1 + int(track["NET"])
+        # Coordinates are converted column by column. For arcs, the first
+        # point is the center, and the second column holds the radius.
+        tracks = self.tracks
+        x1s, y1s = self.columns_to_points(tracks.x1, tracks.y1)
+        x2s, y2s = self.columns_to_points(tracks.x2, tracks.y2)
+        radii = self.column_to_mm(tracks.x2)
+        widths = self.column_to_mm(tracks.width)
+        klayers = [self.layers.translate(name)[0]["layer"] for name in tracks.layer_names]
+        for i in range(len(tracks)):
+            width = widths[i]
+            if tracks.kind[i] == TrackStore.TRACK:
+                x1 = x1s[i]
+                y1 = y1s[i]
+                x2 = x2s[i]
+                y2 = y2s[i]
+                layer = klayers[tracks.layer[i]]
+                netno = 1 + tracks.net[i]
                 if netno >= 1:
                     kpcb.write(
                         f"  (segment"
@@ -1905,16 +1846,16 @@ class Board:
                         f" (net {netno}))\n"
                         )
 
-            if prim["RECORD"] == "Arc":
-                if not "POLYGON" in prim:
-                    layer = self.layers.translate(prim["LAYER"])[0]["layer"]
+            if tracks.kind[i] == TrackStore.ARC:
+                if tracks.polygon[i] == -1:
+                    layer = klayers[tracks.layer[i]]
 
-                    cx, cy = self.to_point(prim["LOCATION.X"], prim["LOCATION.Y"])
-                    r = self.to_mm(prim["RADIUS"])
-                    width = self.to_mm(prim["WIDTH"])
+                    cx = x1s[i]
+                    cy = y1s[i]
+                    r = radii[i]
 
-                    start_angle = prim["ENDANGLE"] % 360
-                    end_angle = prim["STARTANGLE"] % 360
+                    start_angle = tracks.end_angle[i] % 360
+                    end_angle = tracks.start_angle[i] % 360
                     alpha1 = self.to_kicad_angle(start_angle)
                     alpha3 = self.to_kicad_angle(end_angle)
                     alpha2 = alpha1 + ((360 + alpha3 - alpha1) % 360) / 2
@@ -1925,7 +1866,7 @@ class Board:
                     x3 = cx + r * math.sin(alpha3 / 57.29578)
                     y3 = cy - r * math.cos(alpha3 / 57.29578)
 
-                    netno = 1 + int(prim["NET"])
+                    netno = 1 + tracks.net[i]
                     if netno >= 1:
                         kpcb.write(
                             f'  (arc (start {x1:.3f} {y1:.3f})'
@@ -1936,47 +1877,38 @@ class Board:
         kpcb.write("\n")
     
         # Vias
-        for via in self.vias:
+        vias = self.vias
+        xs, ys = self.columns_to_points(vias.x, vias.y)
+        diameters = self.column_to_mm(vias.diameter)
+        holesizes = self.column_to_mm(vias.holesize)
+        for i in range(len(vias)):
             fromto = "F.Cu B.Cu"
-            netid = via.get("NET", None)
-            if netid is not None:
-                netid = int(netid) + 1
-                x, y = self.to_point(via["X"], via["Y"])
-                kpcb.write(
-                    f"  (via (at {x:.3f} {y:.3f})"
-                    f" (size {self.to_mm(via['DIAMETER']):.3f})"
-                    f" (drill {self.to_mm(via['HOLESIZE']):.3f})"
-                    f" (layers {fromto})"
-                    f" (net {netid}))\n"
-                    )
+            netid = vias.net[i] + 1
+            kpcb.write(
+                f"  (via (at {xs[i]:.3f} {ys[i]:.3f})"
+                f" (size {diameters[i]:.3f})"
+                f" (drill {holesizes[i]:.3f})"
+                f" (layers {fromto})"
+                f" (net {netid}))\n"
+                )
         kpcb.write("\n")
 
         # ---------- Zones ----------
         for id, prim in self.polygons.items():
-            netid = prim.get("NET", None)
-            if netid is not None:
-                netid = int(netid)
-                netprim = self.nets[netid+1]
-                polylayer = self.layers.translate(prim["LAYER"])[0]["layer"]
+            if prim.net is not None:
+                netid = prim.net + 1
+                netprim = self.nets[netid]
+                polylayer = self.layers.translate(prim.layer)[0]["layer"]
 
-                kpcb.write(f'  (zone (net {netid+1}) (net_name {netprim["NAME"]}) (layer {polylayer}) (hatch edge 0.508)\n')
+                kpcb.write(f'  (zone (net {netid}) (net_name {netprim["NAME"]}) (layer {polylayer}) (hatch edge 0.508)\n')
                 kpcb.write( '    (priority 1)\n')       # Take priority over background fill in power planes
                 kpcb.write( '    (connect_pads (clearance 0.2))\n')
                 kpcb.write( '    (min_thickness 0.1778)\n')
                 kpcb.write( '    (fill yes (arc_segments 16) (thermal_gap 0.254) (thermal_bridge_width 0.4064))\n')
                 kpcb.write( '    (polygon\n')
                 kpcb.write( '      (pts\n')
-                i = 0
-                while True:
-                    # Key for vertex i
-                    keyx = f'VX{i}'
-                    keyy = f'VY{i}'
-                    if (keyx in prim) and (keyy in prim):
-                        x, y = self.to_point(prim[keyx], prim[keyy])
-                        kpcb.write(f'        (xy {x:.3f} {y:.3f})\n')
-                    else:
-                        break
-                    i += 1
+                xs, ys = self.columns_to_points(prim.x, prim.y)
+                kpcb.write("".join([f'        (xy {x:.3f} {y:.3f})\n' for x, y in zip(xs, ys)]))
                 kpcb.write( '      )\n')
                 kpcb.write( '    )\n')
                 kpcb.write( '  )\n')
@@ -1984,17 +1916,17 @@ class Board:
         # Free fills on keepout layer translate to zones
         # TODO: Must use design rules to adjust size!
         for prim in self.freegraphics:
-            klayers = self.layers.translate(prim["LAYER"])
+            klayers = self.layers.translate(prim.layer)
 
-            if prim["RECORD"] == "Fill":
-                if prim["KEEPOUT"]:
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
+            if isinstance(prim, Fill):
+                if prim.keepout:
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
 
                     # Rotate rectangle vertices
                     cx = (x1 + x2) / 2
                     cy = (y1 + y2) / 2
-                    angle = -prim["ROTATION"]
+                    angle = -prim.rotation
                     xa, ya = pointrotate(cx, cy, x1, y1, angle)
                     xb, yb = pointrotate(cx, cy, x2, y1, angle)
                     xc, yc = pointrotate(cx, cy, x2, y2, angle)
@@ -2006,8 +1938,8 @@ class Board:
                                 '(pads not_allowed) (copperpour not_allowed))\n')
                     kpcb.write( '    (polygon\n')
                     kpcb.write( '      (pts\n')
-                    x1, y1 = self.to_point(prim["X1"], prim["Y1"])
-                    x2, y2 = self.to_point(prim["X2"], prim["Y2"])
+                    x1, y1 = self.to_point(prim.x1, prim.y1)
+                    x2, y2 = self.to_point(prim.x2, prim.y2)
                     kpcb.write(f'        (xy {xa:.3f} {ya:.3f})\n')
                     kpcb.write(f'        (xy {xb:.3f} {yb:.3f})\n')
                     kpcb.write(f'        (xy {xc:.3f} {yc:.3f})\n')
@@ -2030,9 +1962,9 @@ class Board:
 
                     if netname == '(No Net)':
                         s_netname = ''
-                        netid = -1
+                        netid = 0
 
-                    kpcb.write(f'  (zone (net {netid+1}) {s_netname} (layer {layer["kicad"]}) (hatch edge 0.508)\n')
+                    kpcb.write(f'  (zone (net {netid}) {s_netname} (layer {layer["kicad"]}) (hatch edge 0.508)\n')
                     kpcb.write( '    (priority 0)\n')       # Lowest priority
                     kpcb.write( '    (connect_pads (clearance 0.2))\n')
                     kpcb.write( '    (min_thickness 0.1778)\n')
@@ -2050,3 +1982,627 @@ class Board:
         # ---------- Groups ----------
 
         kpcb.write(")\n")
+
+
+# Decoders for the sections that hold the bulk of a board. They only need
+# the section payload and the layer setup, which makes them safe to run in
+# worker processes. Each returns a list of records and a column store (or
+# None) for net tracks, arcs and vias. Board.attach_records() places them.
+def decode_arcs (data, section_element_size, version, layers):
+    # Arcs with a net (version 4) go to the store, all others are returned
+    # as records
+    arcs = []
+    store = TrackStore()
+
+    if version == 3:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...7:      ?
+        8...9:      Component ID
+        10...11:    ?
+        12...13:    ?
+        14...17:    Location.X
+        18...21:    Location.Y
+        22...25:    Radius
+        26...31:    Start Angle (float6)
+        32...37:    End Angle (float6)
+        38...41:    Width
+        42...43:    ?
+        '''
+        start_angles = real48_column(data, 26, section_element_size)
+        end_angles = real48_column(data, 32, section_element_size)
+        for (layer, netno, compno, x, y, radius, width), sa, ea in zip(
+                iter_records(data, ARC_V3, section_element_size), start_angles, end_angles):
+            arc = Arc()
+            arc.layer = layers.get_name(layer)
+            if compno != -1:
+                arc.component = compno
+            if netno != -1:
+                arc.net = netno
+            arc.x = x / 1e4
+            arc.y = y / 1e4
+            arc.radius = radius / 1e4
+            arc.start_angle = sa
+            arc.end_angle = ea
+            arc.width = width / 1e4
+            arcs.append(arc)
+
+    if version == 4:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...9:      ?
+        10:         ?
+        11...12:    Polygon ID
+        13...14:    Component ID
+        15...18:    ?
+        19...22:    Location.X
+        23...26:    Location.Y
+        27...30:    Radius
+        31...36:    Start Angle (float6)
+        37...42:    End Angle (float6)
+        43...46:    Width
+        47...48:    ?
+        '''
+        start_angles = real48_column(data, 31, section_element_size)
+        end_angles = real48_column(data, 37, section_element_size)
+        for (layer, netno, polyno, compno, x, y, radius, width), sa, ea in zip(
+                iter_records(data, ARC_V4, section_element_size), start_angles, end_angles):
+            if netno != -1:
+                store.add_arc(layers.get_name(layer), netno, x, y, radius,
+                              sa, ea, width, polyno)
+                continue
+            arc = Arc()
+            if polyno != -1:
+                arc.polygon = polyno
+            if compno != -1:
+                arc.component = compno
+            arc.start_angle = sa
+            arc.end_angle = ea
+            arc.x = x / 1e4
+            arc.y = y / 1e4
+            arc.radius = radius / 1e4
+            arc.width = width / 1e4
+            arc.layer = layers.get_name(layer)
+            arcs.append(arc)
+
+    return arcs, store
+
+
+def decode_pads (data, section_element_size, version, layers):
+    pads = []
+
+    if version == 3:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...7:      ?
+        8...9:      Component ID
+        10...11:    ?
+        12...13:    ?
+        14...17:    X
+        18...21:    Y
+        22...25:    XSIZE (no padstack: all layers,
+                           padstack: Top layer)
+        26...29:    YSIZE (no padstack: all layers,
+                           padstack: Top layer)
+        30...33:    XSIZE (only padstack: Mid layer)
+        34...37:    YSIZE (only padstack: Mid layer)
+        38...41:    XSIZE (only padstack: Bottom layer)
+        42...45:    YSIZE (only padstack: Bottom layer)
+        46...49:    Holesize
+        50:         Padshape (Top layer) (1=round, 2=rect, 3=octa)
+        51:         Padshape (Inner layers)
+        52:         Padshape (Bottom layer)
+        53...57:    Name (string8, max. 4 (sic!) characters)
+        58...63:    Rotation (float6)
+        64:         Plated?
+        65...66:    ?
+        67...88:    ?
+        89...92:    ?
+        93...100:   ?
+        '''
+        rotations = real48_column(data, 58, section_element_size)
+        for offset, rotation in zip(range(0, len(data), section_element_size), rotations):
+            (layer, netno, compno, x, y, xtop, ytop, xmid, ymid, xbot, ybot,
+             holesize, padshape, plated) = PAD_V3.unpack_from(data, offset)
+            pad = Pad()
+            pad.layer = layers.get_name(layer)
+            if netno != -1:
+                pad.net = netno
+            pad.x = x / 1e4
+            pad.y = y / 1e4
+            xtop /= 1e4
+            ytop /= 1e4
+            xmid /= 1e4
+            ymid /= 1e4
+            xbot /= 1e4
+            ybot /= 1e4
+            stack = (xtop != xmid) or (xtop != xbot) or \
+                    (ytop != ymid) or (ytop != ybot)
+            if stack:
+                pad.top_xsize = xtop
+                pad.top_ysize = ytop
+                pad.mid_xsize = xmid
+                pad.mid_ysize = ymid
+                pad.bot_xsize = xbot
+                pad.bot_ysize = ybot
+            else:
+                pad.xsize = xtop
+                pad.ysize = ytop
+            pad.rotation = rotation
+            shape = "RECTANGLE" if padshape == 2 else "ROUND"
+            pad.shape = "OCTAGONAL" if padshape == 2 else shape
+            pad.plated = "FALSE" if plated == 0 else "TRUE"
+            pad.holesize = holesize / 1e4
+            pad.name = Board.read_string(data, offset + 53)
+            if compno != -1:
+                pad.component = compno
+            pads.append(pad)
+
+    if version == 4:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...7:      ?
+        8:          Tenting (0/1)
+        9:          ?
+        10:         Keepout (0/1)
+        11...12:    ?
+        13...14:    Component ID
+        15...18:    ?
+        19...22:    X
+        23...26:    Y
+        27...30:    XSIZE (no padstack: all layers,
+                           padstack: Top layer)
+        31...34:    YSIZE (no padstack: all layers,
+                           padstack: Top layer)
+        35...38:    XSIZE (only padstack: Mid layer)
+        39...42:    YSIZE (only padstack: Mid layer)
+        43...46:    XSIZE (only padstack: Bottom layer)
+        47...50:    YSIZE (only padstack: Bottom layer)
+        51...54:    Holesize
+        55:         Padshape (Top layer) (1=round, 2=rect, 3=octa)
+        56:         Padshape (Inner layers)
+        57:         Padshape (Bottom layer)
+        58...78:    Name (string8, max. 20 characters)
+        79...84:    Rotation (float6)
+        85:         Plated (0/1)
+        86:         Electrical type (0=Load, 1=Terminator, 2=Source)
+        87...105:   ?
+        106...109:  Paste Maske Override value
+        110...113:  Solder Mask Override value
+        114...120:  ?
+        121:        Paste Mask Override (1=no, 2=yes)
+        122:        Solder Mask Override (1=no, 2=yes)
+        123...124:  ?
+        '''
+        rotations = real48_column(data, 79, section_element_size)
+        for offset, rotation in zip(range(0, len(data), section_element_size), rotations):
+            (layer, netno, compno, x, y, xtop, ytop, xmid, ymid, xbot, ybot,
+             holesize, padshape, plated) = PAD_V4.unpack_from(data, offset)
+            pad = Pad()
+            pad.layer = layers.get_name(layer)
+            if netno != -1:
+                pad.net = netno
+            pad.x = x / 1e4
+            pad.y = y / 1e4
+            xtop /= 1e4
+            ytop /= 1e4
+            xmid /= 1e4
+            ymid /= 1e4
+            xbot /= 1e4
+            ybot /= 1e4
+            stack = (xtop != xmid) or (xtop != xbot) or \
+                    (ytop != ymid) or (ytop != ybot)
+            if stack:
+                pad.top_xsize = xtop
+                pad.top_ysize = ytop
+                pad.mid_xsize = xmid
+                pad.mid_ysize = ymid
+                pad.bot_xsize = xbot
+                pad.bot_ysize = ybot
+            else:
+                pad.xsize = xtop
+                pad.ysize = ytop
+            pad.rotation = rotation
+            shape = "RECTANGLE" if padshape == 2 else "ROUND"
+            pad.shape = "OCTAGONAL" if padshape == 2 else shape
+            pad.plated = "FALSE" if plated == 0 else "TRUE"
+            pad.holesize = holesize / 1e4
+            pad.name = Board.read_string(data, offset + 58)
+            if compno != -1:
+                pad.component = compno
+            pads.append(pad)
+
+    return pads, None
+
+
+def decode_vias (data, section_element_size, version, layers):
+    vias = ViaStore()
+
+    if version == 3:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer (34=MULTILAYER)
+        3:          ?
+        4...5:      Net ID
+        6...13:     ?
+        14...17:    X
+        18...21:    Y
+        22...25:    Diameter
+        26...29:    Hole Size
+        30:         ?
+        31:         Start Layer
+        32:         End Layer
+        '''
+        for (netno, x, y, diameter, holesize, start_layer,
+             end_layer) in iter_records(data, VIA_V3, section_element_size):
+            vias.add(netno, x, y, diameter, holesize, start_layer, end_layer)
+
+    if version == 4:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer (74=MULTILAYER)
+        3:          ?
+        4...5:      Net ID
+        6...18:     ?
+        19...22:    X
+        23...26:    Y
+        27...30:    Diameter
+        31...34:    Hole Size
+        35:         Start Layer
+        36:         End Layer
+        37:         ?
+        38...41:    CCW
+        42...43:    CEN
+        44...47:    CAG
+        48...51:    CPC
+        52...55:    CPR
+        56...74:    ?
+        '''
+        for (netno, x, y, diameter, holesize, start_layer,
+             end_layer) in iter_records(data, VIA_V4, section_element_size):
+            vias.add(netno, x, y, diameter, holesize, start_layer, end_layer)
+
+    return [], vias
+
+
+def decode_tracks (data, section_element_size, version, layers):
+    # Tracks with a net go to the store, all others are returned as records
+    tracks = []
+    store = TrackStore()
+
+    if version == 3:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...7:      ?
+        8...9:      Component ID
+        10...13:    ?
+        14...17:    X1
+        18...21:    Y1
+        22...25:    X2
+        26...29:    Y2
+        30...33:    Width
+        34...37:    ?
+        '''
+        for (layer, netno, compno, x1, y1, x2, y2,
+             width) in iter_records(data, TRACK_V3, section_element_size):
+            if netno != -1:
+                store.add_track(layers.get_name(layer), netno, x1, y1, x2, y2, width)
+                continue
+            track = Track()
+            track.layer = layers.get_name(layer)
+            if compno != -1:
+                track.component = compno
+            track.x1 = x1 / 1e4
+            track.y1 = y1 / 1e4
+            track.x2 = x2 / 1e4
+            track.y2 = y2 / 1e4
+            track.width = width / 1e4
+            track.subpolyindex = 0
+            tracks.append(track)
+
+    if version == 4:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      Net ID
+        6...9:      ?
+        10:         ?
+        11...12:    Polygon ID
+        13...14:    Component ID
+        15...18:    ?
+        19...22:    X1
+        23...26:    Y1
+        27...30:    X2
+        31...34:    Y2
+        35...38:    Width
+        39...40:    Sub PolygonID
+        '''
+        for (layer, netno, polyno, compno, x1, y1, x2, y2, width,
+             subpoly) in iter_records(data, TRACK_V4, section_element_size):
+            if netno != -1:
+                store.add_track(layers.get_name(layer), netno, x1, y1, x2, y2, width, polyno)
+                continue
+            track = Track()
+            track.layer = layers.get_name(layer)
+            if polyno != -1:
+                track.polygon = polyno
+            if compno != -1:
+                track.component = compno
+            track.x1 = x1 / 1e4
+            track.y1 = y1 / 1e4
+            track.x2 = x2 / 1e4
+            track.y2 = y2 / 1e4
+            track.width = width / 1e4
+            track.subpolyindex = subpoly
+            tracks.append(track)
+
+    return tracks, store
+
+
+def decode_texts (data, section_element_size, version, layers):
+    texts = []
+
+    if version == 3:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      ?
+        6...7:      ?
+        8...9:      Component ID
+        10...11:    ?
+        12...13:    ?
+        14...17:    X
+        18...21:    Y
+        22...25:    Height
+        26...27:    ?
+        28...33:    Rotation (float6)
+        34:         ?
+        35...290:   Text (string8, max. 255 characters)
+        291...294:  Width
+        295:        Flag Comment (0/1)
+        296:        Flag Designator (0/1)
+        '''
+        rotations = real48_column(data, 28, section_element_size)
+        for offset, rotation in zip(range(0, len(data), section_element_size), rotations):
+            (layer, compno, x, y, height, width, comment,
+             designator) = TEXT_V3.unpack_from(data, offset)
+            txt = Text()
+            txt.layer = layers.get_name(layer)
+            txt.height = height / 1e4
+            txt.rotation = rotation
+            txt.x = x / 1e4
+            txt.y = y / 1e4
+            txt.text = Board.read_string(data, offset + 35)
+            txt.width = width / 1e4
+            if comment != 0:
+                txt.comment = True
+            if designator != 0:
+                txt.designator = True
+            if compno != -1:
+                txt.component = compno
+            texts.append(txt)
+
+    if version == 4:
+        '''
+        0:          ?
+        1:          ?
+        2:          Layer
+        3:          ?
+        4...5:      ?
+        6...9:      ?
+        10:         ?
+        11...12:    ?
+        13...14:    Component ID
+        15...18:    ?
+        19...22:    X
+        23...26:    Y
+        27...30:    Height
+        31...32:    ?
+        33...38:    Rotation (float6)
+        39:         ?
+        40...295:   Text (string8, max. 255 characters)
+        296...299:  Width
+        300:        Flag Comment (0/1)
+        301:        Flag Designator (0/1)
+        '''
+        rotations = real48_column(data, 33, section_element_size)
+        for offset, rotation in zip(range(0, len(data), section_element_size), rotations):
+            (layer, compno, x, y, height, width, comment,
+             designator) = TEXT_V4.unpack_from(data, offset)
+            txt = Text()
+            txt.x = x / 1e4
+            txt.y = y / 1e4
+            txt.height = height / 1e4
+            txt.rotation = rotation
+            txt.text = Board.read_string(data, offset + 40)
+            txt.width = width / 1e4
+
+            txt.layer = layers.get_name(layer)
+            if comment != 0:
+                txt.comment = True
+            if designator != 0:
+                txt.designator = True
+            if compno != -1:
+                txt.component = compno
+            texts.append(txt)
+
+    return texts, None
+
+
+def decode_fills (data, section_element_size, version, layers):
+    fills = []
+
+    if version == 3:
+        '''
+        0:          Selection (0/1)
+        1:          ?
+        2:          Layer
+        '''
+        # Not decoded yet, version 3 fills are skipped
+
+    if version == 4:
+        '''
+        0:          Selection (0/1)
+        1:          ?
+        2:          Layer
+        3:          Locked (0=locked, 1=unlocked)
+        4...5:      Net ID
+        6...9:      ?
+        10:         Keepout (0/1)
+        11...12:    ?
+        13...14:    Component ID
+        15...18:    ?
+        19...22:    X1
+        23...26:    Y1
+        27...30:    X2
+        31...34:    Y2
+        35...40:    Rotation (float6)
+        '''
+        rotations = real48_column(data, 35, section_element_size)
+        for (layer, compno, x1, y1, x2, y2), rotation in zip(
+                iter_records(data, FILL_V4, section_element_size), rotations):
+            fill = Fill()
+            fill.keepout = layer == 56     # TODO
+            fill.x1 = x1 / 1e4
+            fill.y1 = y1 / 1e4
+            fill.x2 = x2 / 1e4
+            fill.y2 = y2 / 1e4
+            fill.rotation = rotation
+            fill.layer = layers.get_name(layer)
+            if compno != -1:
+                fill.component = compno
+            fills.append(fill)
+
+    return fills, None
+
+
+SECTION_DECODERS = {
+    "Arcs": decode_arcs,
+    "Pads": decode_pads,
+    "Vias": decode_vias,
+    "Tracks": decode_tracks,
+    "Texts": decode_texts,
+    "Fills": decode_fills,
+}
+
+# Number of elements handed to a worker process at once
+PARALLEL_CHUNK_SIZE = 20000
+
+
+# Decoders of the record kinds in ASCII files (value of the RECORD field).
+# They get the key/value dict of a record and the column stores of the
+# block. The result is a record for Board.link_ascii_records(), or None.
+def decode_ascii_arc (rec, tracks, vias):
+    prim = Arc.from_ascii(rec)
+    if (prim.component is None) and (prim.polygon is not None):
+        return None     # ignore
+    return prim
+
+
+def decode_ascii_fill (rec, tracks, vias):
+    prim = Fill.from_ascii(rec)
+    prim.keepout = "KEEPOUT" == rec.get("LAYER", "")
+    prim.rotation = float(rec.get("ROTATION", "0"))
+    return prim
+
+
+def decode_ascii_pad (rec, tracks, vias):
+    # Pads outside of components are not exported
+    prim = Pad.from_ascii(rec)
+    if prim.component is None:
+        return None
+    return prim
+
+
+def decode_ascii_polygon (rec, tracks, vias):
+    return Polygon.from_ascii(rec)
+
+
+def decode_ascii_text (rec, tracks, vias):
+    return Text.from_ascii(rec)
+
+
+def decode_ascii_track (rec, tracks, vias):
+    # Net tracks go to the track store, no record is needed for them
+    if "NET" in rec:
+        tracks.add_track(rec["LAYER"], int(rec["NET"]),
+                         to_units(rec["X1"]), to_units(rec["Y1"]),
+                         to_units(rec["X2"]), to_units(rec["Y2"]),
+                         to_units(rec["WIDTH"]), int(rec.get("POLYGON", -1)))
+        return None
+    prim = Track.from_ascii(rec)
+    if (prim.component is None) and (prim.polygon is not None):
+        return None     # ignore
+    return prim
+
+
+def decode_ascii_via (rec, tracks, vias):
+    # Vias without a net are not exported
+    if "NET" in rec:
+        vias.add(int(rec["NET"]), to_units(rec["X"]), to_units(rec["Y"]),
+                 to_units(rec["DIAMETER"]), to_units(rec["HOLESIZE"]))
+    return None
+
+
+def decode_ascii_fields (rec, tracks, vias):
+    # Records that are linked as they are (Board, Component, Net)
+    return rec
+
+
+ASCII_DECODERS = {
+    "Arc": decode_ascii_arc,
+    "Board": decode_ascii_fields,
+    "Component": decode_ascii_fields,
+    "Fill": decode_ascii_fill,
+    "Net": decode_ascii_fields,
+    "Pad": decode_ascii_pad,
+    "Polygon": decode_ascii_polygon,
+    "Text": decode_ascii_text,
+    "Track": decode_ascii_track,
+    "Via": decode_ascii_via,
+}
+
+
+def decode_ascii_block (data):
+    # Decode a block of complete lines of an ASCII file. Only lines of a
+    # kind listed in ASCII_DECODERS are split into fields, all others are
+    # skipped. Returns the records as (kind, record) pairs in file order,
+    # and the column stores for net tracks and vias.
+    records = []
+    tracks = TrackStore()
+    vias = ViaStore()
+    for line in data.decode("iso8859-15").split("\n"):
+        line = line.rstrip("\r")
+        kind = ascii_record_kind(line)
+        decoder = ASCII_DECODERS.get(kind, None)
+        if decoder is not None:
+            prim = decoder(ascii_fields(line), tracks, vias)
+            if prim is not None:
+                records.append((kind, prim))
+    return records, tracks, vias
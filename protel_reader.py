@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+import mmap
+import os
+import struct
+
+
+# Little-endian integers
+INT8 = struct.Struct('<b')
+UINT8 = struct.Struct('<B')
+INT16 = struct.Struct('<h')
+UINT16 = struct.Struct('<H')
+INT32 = struct.Struct('<i')
+UINT32 = struct.Struct('<I')
+
+
+# Decoded real48 values by their raw bytes. Rotations and angles mostly
+# take a few values (0, 90, 180, 270, 360), so the cache stays small. It
+# stops growing at REAL48_CACHE_SIZE entries.
+REAL48_CACHE = {}
+REAL48_CACHE_SIZE = 4096
+
+
+def real48 (raw):
+    '''
+    Turbo Pascal 'real' (6 bytes)
+
+    0:          Exponent (biased by 129, 0 means 0.0)
+    1...5:      Mantissa (40 bits, little-endian), MSB of byte 5 is the sign
+    '''
+    if type(raw) is not bytes:
+        raw = bytes(raw)
+    f = REAL48_CACHE.get(raw, None)
+    if f is None:
+        if raw[0] == 0:
+            f = 0
+        else:
+            f = UINT32.unpack_from(raw, 1)[0] / 4294967296.0
+            f = (f + int(raw[5] & 0x7F)) / 128.0 + 1
+            f *= 2 ** (raw[0] - 129)
+            if (raw[5] & 0x80) != 0:
+                f = -f
+        if len(REAL48_CACHE) < REAL48_CACHE_SIZE:
+            REAL48_CACHE[raw] = f
+    return f
+
+
+def real48_column (data, offset, stride):
+    # Decode the real48 field at 'offset' of every record in a buffer of
+    # 'stride' byte records, e.g. the rotations of all pads in a section
+    data = memoryview(data)
+    try:
+        hash(data[0:0])
+    except (TypeError, ValueError):
+        data = memoryview(bytes(data))      # Slices must be hashable
+    get = REAL48_CACHE.get
+    values = []
+    append = values.append
+    for start in range(offset, stride * (len(data) // stride), stride):
+        raw = data[start:start+6]
+        f = get(raw, None)
+        if f is None:
+            f = real48(raw)
+        append(f)
+    return values
+
+
+def string8_at (data, offset):
+    # Pascal string (length byte + characters) at an offset in a buffer
+    length = data[offset]
+    return str(data[offset+1:offset+1+length], "iso8859_15")
+
+
+class BinaryReader:
+    '''
+    Read cursor over a binary Protel document (SCH, LIB or PCB).
+
+    The source is either an open file, which gets memory-mapped, or a
+    document that is already in memory (bytes, bytearray, memoryview,
+    mmap). Reading starts at the current position of a file. read()
+    returns memoryview slices into the source, the typed readers decode
+    directly from it without copying.
+    '''
+    def __init__ (self, source, name=""):
+        self.mmap = None
+        pos = 0
+        if hasattr(source, "read"):
+            name = getattr(source, "name", name)
+            pos = source.tell()
+            try:
+                fileno = source.fileno()
+            except (AttributeError, OSError):
+                fileno = None
+            if fileno is None:
+                # File-like object without a file descriptor (e.g. BytesIO)
+                source.seek(0)
+                source = source.read()
+            elif os.fstat(fileno).st_size > 0:
+                self.mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+                source = self.mmap
+            else:
+                source = b""
+        self.data = memoryview(source)
+        self.name = name
+        self.pos = pos
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.close()
+
+    def __len__ (self):
+        return len(self.data)
+
+    def seek (self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.data)
+        self.pos = offset
+        return self.pos
+
+    def tell (self):
+        return self.pos
+
+    def skip (self, size):
+        self.pos += size
+
+    def read (self, size=-1):
+        start = self.pos
+        if (size < 0) or (start + size > len(self.data)):
+            self.pos = len(self.data)
+        else:
+            self.pos = start + size
+        return self.data[start:self.pos]
+
+    def unpack (self, layout):
+        # Decode a precompiled struct layout at the current position
+        values = layout.unpack_from(self.data, self.pos)
+        self.pos += layout.size
+        return values
+
+    def int8 (self):
+        return self.unpack(INT8)[0]
+
+    def uint8 (self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def int16 (self):
+        return self.unpack(INT16)[0]
+
+    def uint16 (self):
+        return self.unpack(UINT16)[0]
+
+    def int32 (self):
+        return self.unpack(INT32)[0]
+
+    def uint32 (self):
+        return self.unpack(UINT32)[0]
+
+    def real48 (self):
+        value = real48(self.data[self.pos:self.pos + 6])
+        self.pos += 6
+        return value
+
+    def string8 (self):
+        # Pascal string: length byte + characters
+        data = self.data
+        start = self.pos + 1
+        self.pos = start + data[start - 1]
+        return str(data[start:self.pos], "iso8859_15")
+
+    def string16 (self):
+        # Long string: 16-bit length + characters
+        start = self.pos + 2
+        self.pos = start + UINT16.unpack_from(self.data, start - 2)[0]
+        return str(self.data[start:self.pos], "iso8859_15")
+
+    def close (self):
+        # Decoded records never keep slices of the reader, so the mapping
+        # can be released as soon as parsing is done. If a slice is still
+        # alive (e.g. referenced from a traceback), the mapping is released
+        # by the garbage collector instead.
+        self.data.release()
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass
+            self.mmap = None
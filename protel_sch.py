@@ -6,7 +6,8 @@ import math
 import ntpath
 import os
 from PIL import Image
-from protel_primitive import Primitive, ProtelString, KicadString
+from protel_primitive import Primitive, KicadString, escape_string
+from protel_reader import BinaryReader
 import struct
 import textwrap
 import uuid
@@ -20,26 +21,32 @@ class SchSymbol:
         self.globals = {}
         self.parts = []
         self.filename = filename
-        self.ps = ProtelString(bin_file)
         self.file = bin_file
 
+    def __getstate__ (self):
+        # The reader is only needed while parsing. It is not part of a
+        # pickled model (e.g. in the model cache).
+        state = self.__dict__.copy()
+        state["file"] = None
+        return state
+
     def symbol_body_from_bin_file (self):
-        self.ps()
-        self.globals["description"] = self.ps()
-        self.globals["footprint1"] = self.ps()
-        self.globals["footprint2"] = self.ps()
-        self.globals["footprint3"] = self.ps()
-        self.globals["footprint4"] = self.ps()
-        self.globals["textfield1"] = self.ps()
-        self.globals["textfield2"] = self.ps()
-        self.globals["textfield3"] = self.ps()
-        self.globals["textfield4"] = self.ps()
-        self.globals["textfield5"] = self.ps()
-        self.globals["textfield6"] = self.ps()
-        self.globals["textfield7"] = self.ps()
-        self.globals["textfield8"] = self.ps()
-        self.globals["designator"] = self.ps()
-        self.globals["sheet_part_filename"] = self.ps()
+        self.file.string8()
+        self.globals["description"] = escape_string(self.file.string8())
+        self.globals["footprint1"] = escape_string(self.file.string8())
+        self.globals["footprint2"] = escape_string(self.file.string8())
+        self.globals["footprint3"] = escape_string(self.file.string8())
+        self.globals["footprint4"] = escape_string(self.file.string8())
+        self.globals["textfield1"] = escape_string(self.file.string8())
+        self.globals["textfield2"] = escape_string(self.file.string8())
+        self.globals["textfield3"] = escape_string(self.file.string8())
+        self.globals["textfield4"] = escape_string(self.file.string8())
+        self.globals["textfield5"] = escape_string(self.file.string8())
+        self.globals["textfield6"] = escape_string(self.file.string8())
+        self.globals["textfield7"] = escape_string(self.file.string8())
+        self.globals["textfield8"] = escape_string(self.file.string8())
+        self.globals["designator"] = escape_string(self.file.string8())
+        self.globals["sheet_part_filename"] = escape_string(self.file.string8())
         nparts = struct.unpack('<h', self.file.read(2))[0]
 
         for partno in range(nparts):
@@ -73,7 +80,7 @@ class SchSymbol:
         # Read component directory
         nvariants = struct.unpack('<h', bin_file.read(2))[0]
         for v in range(nvariants):
-            sym.variants.append(sym.ps())
+            sym.variants.append(escape_string(bin_file.string8()))
         sym.name = sym.variants[0] if nvariants > 0 else ""
 
         sym.symbol_body_from_bin_file()
@@ -88,7 +95,7 @@ class SchSymbol:
 
         nvariants = struct.unpack('<h', bin_file.read(2))[0]
         for v in range(nvariants):
-            sym.variants.append(sym.ps())
+            sym.variants.append(escape_string(bin_file.string8()))
         sym.name = sym.variants[0] if nvariants > 0 else ""
 
         go_back_to = bin_file.tell()
@@ -98,24 +105,24 @@ class SchSymbol:
         sym.symbol_body_from_bin_file()
 
         # More global data
-        sym.ps()
-        sym.ps()
-        sym.globals["partfieldname1"] = sym.ps()
-        sym.globals["partfieldname2"] = sym.ps()
-        sym.globals["partfieldname3"] = sym.ps()
-        sym.globals["partfieldname4"] = sym.ps()
-        sym.globals["partfieldname5"] = sym.ps()
-        sym.globals["partfieldname6"] = sym.ps()
-        sym.globals["partfieldname7"] = sym.ps()
-        sym.globals["partfieldname8"] = sym.ps()
-        sym.globals["partfieldname9"] = sym.ps()
-        sym.globals["partfieldname10"] = sym.ps()
-        sym.globals["partfieldname11"] = sym.ps()
-        sym.globals["partfieldname12"] = sym.ps()
-        sym.globals["partfieldname13"] = sym.ps()
-        sym.globals["partfieldname14"] = sym.ps()
-        sym.globals["partfieldname15"] = sym.ps()
-        sym.globals["partfieldname16"] = sym.ps()
+        bin_file.string8()
+        bin_file.string8()
+        sym.globals["partfieldname1"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname2"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname3"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname4"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname5"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname6"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname7"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname8"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname9"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname10"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname11"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname12"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname13"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname14"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname15"] = escape_string(bin_file.string8())
+        sym.globals["partfieldname16"] = escape_string(bin_file.string8())
 
         bin_file.seek(go_back_to)
 
@@ -377,18 +384,20 @@ class SchematicLibrary:
 
     @classmethod
     def from_protel_bin (cls, filename, plib):
+        # 'plib' is positioned after the file header
+        if not isinstance(plib, BinaryReader):
+            plib = BinaryReader(plib)
         lib = cls()
-        ps = ProtelString(plib)
 
         plib.read(4)
-        lib.full_name = ps()   # Library Name
+        lib.full_name = escape_string(plib.string8())   # Library Name
         plib.read(11)
 
         # Font names: int16 count, then count*fonts
         nfonts = struct.unpack('<h', plib.read(2))[0]
         for n in range(nfonts):
             plib.read(8)
-            name = ps()     # Font name
+            name = escape_string(plib.string8())     # Font name
             lib.fonts.append({"name":name})
 
         # Read component directory
@@ -503,6 +512,31 @@ class CoordinateTransform:
 
 
 class Schematic:
+    # Output section of each instance type in to_kicad7(). Instances that
+    # share a section are written in file order. Types without a section
+    # are not exported.
+    SECTIONS = {
+        "junction": "junctions",
+        "noerc": "no_connects",
+        "wire": "wires",
+        "bus": "wires",
+        "bus_entry": "bus_entries",
+        "image": "images",
+        "polyline": "graphics",
+        "rectangle": "graphics",
+        "rounded_rectangle": "graphics",
+        "ellipse": "graphics",
+        "polygon": "graphics",
+        "bezier": "graphics",
+        "text_frame": "text_frames",
+        "text": "texts",
+        "net_label": "labels",
+        "port": "ports",
+        "component": "symbols",
+        "powerobject": "symbols",
+        "sheet_symbol": "sheets",
+        }
+
     def __init__ (self, filename):
         self.fonts = []
         self.syms = []
@@ -518,6 +552,29 @@ class Schematic:
             font = self.fonts[index - 1]
         return font
 
+    @staticmethod
+    def get_image_file (ci, directory=""):
+        # Protel does not store the image, but rather just the path
+        # to the image on the system where the Protel file was created.
+        # See if we can find the image in the directory of the
+        # Protel file. The directory is not part of the model, so that
+        # a cached model does not depend on where the file was read.
+        return os.path.join(directory, ntpath.basename(ci["name"]))
+
+    def get_image_files (self, directory=""):
+        # Image files the output depends on (whether they exist or not)
+        return [self.get_image_file(ci, directory) for ci in self.component_instances
+                if ci["type"] == "image"]
+
+    def get_sections (self):
+        # Sort the instances into their output sections in a single pass
+        sections = {name: [] for name in self.SECTIONS.values()}
+        for ci in self.component_instances:
+            section = self.SECTIONS.get(ci["type"], None)
+            if section is not None:
+                sections[section].append(ci)
+        return sections
+
     def get_bounds (self):
         xmax = -1e12
         ymax = -1e12
@@ -621,8 +678,10 @@ class Schematic:
 
     @classmethod
     def from_protel_bin (cls, filename, bin_file):
+        # 'bin_file' is positioned after the file header
+        if not isinstance(bin_file, BinaryReader):
+            bin_file = BinaryReader(bin_file)
         sch = cls(filename)
-        ps = ProtelString(bin_file)
 
         # One 32-bit integer
         bin_file.read(4)
@@ -639,7 +698,7 @@ class Schematic:
             font["italic"] = fontdef[5]         # (0/1)
             font["bold"] = fontdef[6]           # (0/1)
             font["strikeout"] = fontdef[7]      # (0/1)
-            font["name"] = ps()
+            font["name"] = escape_string(bin_file.string8())
             sch.fonts.append(font)
             #print(sch.fonts[n]["name"], " ".join(f"{x:02X}" for x in fontdef))
 
@@ -653,14 +712,14 @@ class Schematic:
 
         # Workspace
         #print("Reading workspace definition @0x{:X}".format(bin_file.tell()))
-        sch.canvas["organization"] = ps()       # Organization
-        sch.canvas["address1"] = ps()           # Address 1
-        sch.canvas["address2"] = ps()           # Address 2
-        sch.canvas["address3"] = ps()           # Address 3
-        sch.canvas["address4"] = ps()           # Address 4
-        sch.canvas["document_title"] = ps()     # Document Title
-        sch.canvas["document_number"] = ps()    # Document No
-        sch.canvas["revision"] = ps()           # Revision
+        sch.canvas["organization"] = escape_string(bin_file.string8())       # Organization
+        sch.canvas["address1"] = escape_string(bin_file.string8())           # Address 1
+        sch.canvas["address2"] = escape_string(bin_file.string8())           # Address 2
+        sch.canvas["address3"] = escape_string(bin_file.string8())           # Address 3
+        sch.canvas["address4"] = escape_string(bin_file.string8())           # Address 4
+        sch.canvas["document_title"] = escape_string(bin_file.string8())     # Document Title
+        sch.canvas["document_number"] = escape_string(bin_file.string8())    # Document No
+        sch.canvas["revision"] = escape_string(bin_file.string8())           # Revision
         sch.canvas["page_number"] = struct.unpack('<h', bin_file.read(2))[0]
         sch.canvas["page_total"] = struct.unpack('<h', bin_file.read(2))[0]
         bin_file.read(2)
@@ -675,9 +734,9 @@ class Schematic:
         bin_file.read(4)    # color RGBA
         bin_file.read(4)    # color RGBA
         sch.canvas["grid_snap_enable"] = struct.unpack('B', bin_file.read(1))[0]
-        sch.canvas["grid_snap_size"] = bin_file.read(2)     # Grid snap size
+        sch.canvas["grid_snap_size"] = bytes(bin_file.read(2))     # Grid snap size
         sch.canvas["grid_visible"] = struct.unpack('B', bin_file.read(1))[0]
-        sch.canvas["grid_size"] = bin_file.read(2)          # Grid size
+        sch.canvas["grid_size"] = bytes(bin_file.read(2))          # Grid size
         sch.canvas["w"] = struct.unpack('<h', bin_file.read(2))[0] * 0.254
         sch.canvas["h"] = struct.unpack('<h', bin_file.read(2))[0] * 0.254
         sch.canvas["custom_style"] = bin_file.read(1)[0]
@@ -695,7 +754,11 @@ class Schematic:
 
         return sch
 
-    def to_kicad7 (self, ksch, klib, klibpower):
+    def to_kicad7 (self, ksch, klib, klibpower, images=None, directory=""):
+        # 'images' maps upper case file names to the content of images held
+        # in memory (e.g. from a .DDB). Without it, image files are read
+        # from 'directory', the directory of the schematic file.
+
         # Export library
         lib = SchematicLibrary.from_syms(self.syms)
         lib.to_kicad7(klib)
@@ -706,6 +769,7 @@ class Schematic:
         w, h = self.get_canvas_size()
         #print(f"canvas size: {w}x{h}, bounds: ({x1},{y1}) / ({x2},{y2})")
         ct = CoordinateTransform(w, h, x1, y1, x2, y2)
+        sections = self.get_sections()
 
         # Header
         ksch.write( "(kicad_sch (version 20230121) (generator protel2kicad)\n")
@@ -753,7 +817,7 @@ class Schematic:
         # Power symbols
         # We define a new KiCad power symbol for each combination of
         # net name and Protel power symbol.
-        for ci in self.component_instances:
+        for ci in sections["symbols"]:
             if ci["type"] == "powerobject":
                 protel_symbol = ci["symbol"]
                 netname = ci["name"]
@@ -767,7 +831,7 @@ class Schematic:
         ksch.write( "\n")
 
         # Junction Section
-        for ci in self.component_instances:
+        for ci in sections["junctions"]:
             if ci["type"] == "junction":
                 uu = uuid.uuid4()
                 x, y = ct(ci['x'], ci['y'])
@@ -777,7 +841,7 @@ class Schematic:
         ksch.write( "\n")
     
         # No Connect Section
-        for ci in self.component_instances:
+        for ci in sections["no_connects"]:
             if ci["type"] == "noerc":
                 uu = uuid.uuid4()
                 x, y = ct(ci['x'], ci['y'])
@@ -786,7 +850,7 @@ class Schematic:
 
         # Wire and Bus Section
         # a) Wrires and Busses
-        for ci in self.component_instances:
+        for ci in sections["wires"]:
             if ci["type"] == "wire":
                 npoints = ci["npoints"]
                 if (npoints >= 2):
@@ -812,7 +876,7 @@ class Schematic:
                         ksch.write(f"    (uuid {uu})\n")
                         ksch.write( "  )\n")
         # b) Bus Entries
-        for ci in self.component_instances:
+        for ci in sections["bus_entries"]:
             if ci["type"] == "bus_entry":
                 x1, y1 = (ci["x1"], ci["y1"])
                 x2, y2 = (ci["x2"], ci["y2"])
@@ -820,7 +884,7 @@ class Schematic:
 
                 # See if any wire touches the bus entry on one side
                 # Then use that as the bus entry's location
-                for ciw in self.component_instances:
+                for ciw in sections["wires"]:
                     if ciw["type"] == "wire":
                         npointsw = ciw["npoints"]
                         pointsw = ciw["points"]
@@ -848,23 +912,24 @@ class Schematic:
         ksch.write( "\n")
     
         # Image Section
-        for ci in self.component_instances:
+        for ci in sections["images"]:
             if ci["type"] == "image":
                 x1, y1 = ct(ci["x1"], ci["y1"])
                 x2, y2 = ct(ci["x2"], ci["y2"])
 
-                img_path = ci.get("path", "")
-
-                # Protel does not store the image, but rather just the path
-                # to the image on the system where the Protel file was created.
-                # See if we can find the image in the directory of the
-                # Protel file.
-                img_filename = os.path.join(img_path, ntpath.basename(ci["name"]))
-
+                img_filename = self.get_image_file(ci, directory)
+                img_file = None
+                if images is not None:
+                    data = images.get(os.path.basename(img_filename).upper(), None)
+                    if data is not None:
+                        img_file = BytesIO(data)
 #TODO: Determine path relative to schematic
-                if os.path.isfile(img_filename):
+                elif os.path.isfile(img_filename):
+                    img_file = img_filename
+
+                if img_file is not None:
                     # Force to PNG format with PIL library
-                    im = Image.open(img_filename)
+                    im = Image.open(img_file)
                     png = BytesIO()
                     im.save(png, "PNG")
                     png.seek(0)
@@ -897,7 +962,7 @@ class Schematic:
                     print(f"  Cannot find image file {img_filename}")
 
         # Graphical Line Section
-        for ci in self.component_instances:
+        for ci in sections["graphics"]:
             if ci["type"] == "polyline":
                 width = ci["borderwidth"]
                 if ci["style"] == 1:
@@ -1022,7 +1087,7 @@ class Schematic:
             '''
 
         # Graphical Text Section
-        for ci in self.component_instances:
+        for ci in sections["text_frames"]:
             if ci["type"] == "text_frame":
                 x, y = ct(ci["x1"], ci["y2"])   # sic!
                 sizex = ci["x2"] - ci["x1"]
@@ -1060,7 +1125,7 @@ class Schematic:
                 ksch.write( "  )\n")
         ksch.write( "\n")
 
-        for ci in self.component_instances:
+        for ci in sections["texts"]:
             if ci["type"] == "text":
                 x, y = ct(ci["x"], ci["y"])
                 rotation = ci["rotation"]
@@ -1079,7 +1144,7 @@ class Schematic:
         ksch.write( "\n")
 
         # Local Label Section
-        for ci in self.component_instances:
+        for ci in sections["labels"]:
             if ci["type"] == "net_label":
                 x, y = ct(ci["x"], ci["y"])
                 rotation = ci["rotation"]
@@ -1091,7 +1156,7 @@ class Schematic:
                 ksch.write( "  )\n")
 
         # Global Label Section
-        for ci in self.component_instances:
+        for ci in sections["ports"]:
             if ci["type"] == "port":
                 style = ci["style"]
                 iotype = ci["iotype"]
@@ -1143,7 +1208,7 @@ class Schematic:
                 ksch.write( "  )\n")
 
         # Symbol Section
-        for ci in self.component_instances:
+        for ci in sections["symbols"]:
             if ci["type"] == "component":
                 prims = ci["prims"]
     
@@ -1223,7 +1288,7 @@ class Schematic:
                     ksch.write( "  )\n")
 
         # Sheets
-        for ci in self.component_instances:
+        for ci in sections["sheets"]:
             if ci["type"] == "sheet_symbol":
                 xsheet, ysheet = ct(ci["x"], ci["y"])
                 xsize = ci["xsize"]
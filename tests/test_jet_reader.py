@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+
+# The built-in Jet 4 reader on the test database made by
+# tools/make_test_ddb.py. The expected entries in items.jsonl are written
+# by the same script from its list of items, in the line format of
+# mdb-json, and read with the parser of the mdb-json path. They are not a
+# capture of mdb-json output, so the tests check the reader against the
+# items the database was made from, not against mdbtools.
+#
+#     python3 -m unittest discover tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jet_reader import JetDatabase, LVAL_INLINE, LVAL_SINGLE_PAGE
+from p2k import DDB_TREE_COLUMNS, get_ddb_item_paths, parse_mdb_json_item, read_ddb_items
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DDB_PATH = os.path.join(DATA_DIR, "items.ddb")
+JSONL_PATH = os.path.join(DATA_DIR, "items.jsonl")
+
+
+def read_expected_items (columns=None):
+    with open(JSONL_PATH, "rb") as f:
+        return [row for row in (parse_mdb_json_item(line, columns) for line in f)
+                if row is not None]
+
+
+class JetReaderTest (unittest.TestCase):
+
+    def setUp (self):
+        self.db = JetDatabase.open(DDB_PATH)
+
+    def tearDown (self):
+        self.db.close()
+
+    def test_items_match_expected (self):
+        items = list(read_ddb_items(DDB_PATH, self.db))
+        self.assertEqual([row["ItemID"] for row in items],
+                         [row["ItemID"] for row in read_expected_items()])
+        for row, expected in zip(items, read_expected_items()):
+            for column in ("ItemID", "ParentID", "Name", "Data"):
+                self.assertEqual(row[column], expected[column], (row["Name"], column))
+
+    def test_tree_columns_only (self):
+        expected = read_expected_items(DDB_TREE_COLUMNS)
+        items = list(read_ddb_items(DDB_PATH, self.db, DDB_TREE_COLUMNS))
+        self.assertEqual(items, expected)
+        self.assertTrue(all("Data" not in row for row in items))
+
+    def test_long_values (self):
+        # Content stored in the row, on a page of its own and on a chain
+        # of pages
+        self.assertEqual(self.long_value_kind("readme.txt"), "inline")
+        self.assertEqual(self.long_value_kind("logo.bmp"), "page")
+        self.assertEqual(self.long_value_kind("board.pcb"), "chain")
+        expected = {row["Name"]: row["Data"] for row in read_expected_items()}
+        for row in self.db.iter_rows("Items", ("Name", "Data")):
+            self.assertEqual(row["Data"], expected[row["Name"]], row["Name"])
+
+    def long_value_kind (self, name):
+        # How the content of item 'name' is stored, from the header of its
+        # 'Data' column
+        table = self.db.read_table_definition("Items", self.db.get_tables()["Items"])
+        column = [column for column in table.columns if column.name == "Data"][0]
+        for number in self.db.table_pages(table):
+            page = self.db.page(number)
+            for index in range(int.from_bytes(page[12:14], "little")):
+                flags, start, end = self.db.row_bounds(page, index)
+                row = page[start:end]
+                if self.db.decode_row(table, row, ("Name",))["Name"] != name:
+                    continue
+                # Variable length column offsets precede the column count
+                # and null mask at the end of the row
+                offsets = len(row) - (len(table.columns) + 7) // 8 - 4 - 2 * column.var_index
+                field_start = int.from_bytes(row[offsets:offsets + 2], "little")
+                header = int.from_bytes(row[field_start:field_start + 4], "little")
+                if header & LVAL_INLINE:
+                    return "inline"
+                if header & LVAL_SINGLE_PAGE:
+                    return "page"
+                return "chain"
+        return None
+
+    def test_deleted_rows_are_skipped (self):
+        names = [row["Name"] for row in self.db.iter_rows("Items", ("Name",))]
+        self.assertNotIn("deleted.sch", names)
+        self.assertEqual(len(names), len(read_expected_items()))
+
+    def test_item_paths (self):
+        paths = get_ddb_item_paths(DDB_PATH, self.db)
+        self.assertEqual(paths[10], "readme.txt")
+        self.assertEqual(paths[12], os.path.join("Boards", "board.pcb"))
+        self.assertEqual(paths[13], "Ωmega.sch")
+        self.assertNotIn(14, paths)         # In the recycle bin
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+# Emit cost of a synthetic PCB 4.0 board: KiCad output per primitive, and
+# the layer translation done for every primitive. translate_name() is the
+# translation as it is computed for a layer the first time (and formerly
+# on every call), translate() is the table lookup used while writing.
+#
+#     ./bench_emit.py [components [tracks]]
+
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gen_pcb import gen_pcb4
+from kicad_writer import KicadWriter
+from protel_pcb import Board
+
+
+if __name__ == "__main__":
+    ncomp = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    ntracks = int(sys.argv[2]) if len(sys.argv) > 2 else ncomp * 10
+    pcb = Board.from_protel_bin("bench", gen_pcb4(ncomp, ntracks))
+    nprims = (len(pcb.tracks) + len(pcb.vias) + len(pcb.freegraphics)
+              + sum(len(fp["prims"]) for fp in pcb.fps.values()))
+
+    def emit ():
+        with KicadWriter(io.StringIO()) as kpcb:
+            pcb.to_kicad7(kpcb, "bench_export_pcb.pretty")
+
+    emit()
+    elapsed = min(timeit.repeat(emit, number=1, repeat=3))
+    print(f"to_kicad7:        {elapsed:.2f} s for {nprims} primitives, "
+          f"{elapsed / nprims * 1e6:.1f} us/primitive")
+
+    n = 100000
+    for name in ("translate_name", "translate"):
+        method = getattr(pcb.layers, name)
+        per_call = timeit.timeit(lambda: method("TopLayer"), number=n) / n
+        print(f"{name + '():':17s} {per_call * 1e6:.2f} us/call")
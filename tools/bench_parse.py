@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+
+# Parse time of synthetic PCB 4.0 boards with a growing number of
+# components (10 tracks per component). With footprints registered by
+# component ID, the time per component stays flat as the board grows.
+#
+#     ./bench_parse.py [components ...]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gen_pcb import gen_pcb4
+from protel_pcb import Board
+
+
+if __name__ == "__main__":
+    counts = [int(n) for n in sys.argv[1:]] or [500, 1000, 2000, 4000]
+    first = None
+    for ncomp in counts:
+        data = gen_pcb4(ncomp, ncomp * 10)
+        start = time.perf_counter()
+        Board.from_protel_bin("bench", data)
+        elapsed = time.perf_counter() - start
+        per_component = elapsed / ncomp
+        if first is None:
+            first = per_component
+        print(f"{ncomp:6d} components: {elapsed:7.3f} s  "
+              f"{per_component * 1e6:7.1f} us/component  ({per_component / first:.2f}x)")
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+
+# Generator of synthetic Protel PCB 4.0 binary files for the benchmarks in
+# this folder. The boards are not meant to make sense electrically, but
+# every section the converter reads is populated, with records that refer
+# to components, nets and polygons.
+#
+#     ./gen_pcb.py <components> <tracks> <output.pcb>
+
+import math
+import random
+import struct
+import sys
+
+
+def real48 (v):
+    # Turbo Pascal 6-byte real
+    if v == 0:
+        return bytes(6)
+    sign = 0x80 if v < 0 else 0
+    v = abs(v)
+    e = math.floor(math.log2(v))
+    frac = v / (2 ** e) - 1.0
+    m = int(round(frac * (2 ** 39)))
+    if m >= 2 ** 39:
+        m = 0
+        e += 1
+    b0 = e + 129
+    lo = m & 0xFFFFFFFF
+    hi = (m >> 32) & 0x7F
+    return bytes([b0]) + struct.pack('<I', lo) + bytes([hi | sign])
+
+
+def s8 (s, width=None):
+    # Length-prefixed string, optionally padded to a fixed field width
+    b = s.encode('iso8859_15')
+    out = bytes([len(b)]) + b
+    if width is not None:
+        out = out + bytes(width - len(out))
+    return out
+
+
+def put (buf, off, data):
+    buf[off:off + len(data)] = data
+
+
+class Sections:
+    # Linked list of sections: 256 byte name field, element size, count,
+    # offset of the next section, payload
+    def __init__ (self):
+        self.secs = []
+
+    def add (self, name, elsize, count, payload):
+        self.secs.append((name, elsize, count, payload))
+
+    def build (self):
+        out = bytearray()
+        offsets = []
+        pos = 0
+        for name, elsize, count, payload in self.secs:
+            offsets.append(pos)
+            pos += 266 + len(payload)
+        for i, (name, elsize, count, payload) in enumerate(self.secs):
+            nxt = offsets[i + 1] if i + 1 < len(self.secs) else 0
+            hdr = bytearray(256)
+            put(hdr, 0, s8(name))
+            out += hdr + struct.pack('<HII', elsize, count, nxt) + payload
+        return bytes(out)
+
+
+def layer_names_v4 ():
+    names = {1: "TopLayer"}
+    for i in range(2, 32):
+        names[i] = f"MidLayer{i-1}"
+    names[32] = "BottomLayer"
+    names[33] = "TopOverlay"
+    names[34] = "BottomOverlay"
+    names[35] = "TopPaste"
+    names[36] = "BottomPaste"
+    names[37] = "TopSolder"
+    names[38] = "BottomSolder"
+    for i in range(39, 55):
+        names[i] = f"InternalPlane{i-38}"
+    names[55] = "DrillGuide"
+    names[56] = "KeepOutLayer"
+    for i in range(57, 73):
+        names[i] = f"Mechanical{i-56}"
+    names[73] = "DrillDrawing"
+    names[74] = "MultiLayer"
+    return names
+
+
+def board_fields ():
+    names = layer_names_v4()
+    nxt = {1: 39, 39: 2, 2: 32, 32: 0}
+    f = ["RECORD=Board", "ORIGINX=1000mil", "ORIGINY=500mil", "TOPCONST=3.6",
+         "TOPHEIGHT=0.5mil", "BOTTOMCONST=3.4", "BOTTOMHEIGHT=0.6mil",
+         "PLANE1NETNAME=GND"]
+    for i in range(1, 75):
+        f.append(f"LAYER{i}NAME={names[i]}")
+        f.append(f"LAYER{i}PREV=0")
+        f.append(f"LAYER{i}NEXT={nxt.get(i, 0)}")
+        f.append(f"LAYER{i}MECHENABLED=FALSE")
+        f.append(f"LAYER{i}COPTHICL=1.4mil")
+        f.append(f"LAYER{i}DIELCONST=4.8")
+        f.append(f"LAYER{i}DIELHEIGHT=12.6mil")
+        f.append(f"LAYER{i}DIELTYPE={1 if i != 32 else 0}")
+        f.append(f"LAYER{i}DIELMATERIAL=FR-4")
+    return f
+
+
+def gen_pcb4 (ncomp, ntracks, seed=1, poly_vertices=None):
+    rnd = random.Random(seed)
+    secs = Sections()
+
+    fields = board_fields()
+    s = "|" + "|".join(fields)
+    payload = b"\x00\x00" + struct.pack('<H', len(s)) + s.encode()
+    secs.add("PCB 4.0 Binary File", 0, 1, payload)
+
+    nnets = max(4, ncomp)
+    netnames = ["GND", "VCC"] + [f"N{i}" for i in range(2, nnets)]
+    payload = b""
+    for i, n in enumerate(netnames):
+        s = f"|RECORD=Net|NAME={n}|VISIBLE=TRUE"
+        payload += b"\x00\x00" + struct.pack('<H', len(s)) + s.encode()
+    secs.add("Nets", 0, len(netnames), payload)
+
+    s = "|RECORD=Class|NAME=All Nets|KIND=0"
+    secs.add("Classes", 0, 1, b"\x00\x00" + struct.pack('<H', len(s)) + s.encode())
+
+    def rc ():
+        return rnd.randint(0, 40000000)
+
+    # Components
+    size = 581
+    payload = bytearray()
+    for c in range(ncomp):
+        rec = bytearray(size)
+        rec[2] = 1 if c % 3 else 32
+        put(rec, 4, struct.pack('<H', c))
+        put(rec, 39, struct.pack('<ii', rc(), rc()))
+        put(rec, 47, s8(f"FP{c % 7}"))
+        put(rec, 309, real48([0, 90, 180, 270, 45][c % 5]))
+        payload += rec
+    secs.add("Components", size, ncomp, bytes(payload))
+
+    # Polygons
+    payload = bytearray()
+    npoly = 3
+    for p in range(npoly):
+        rec = bytearray(45)
+        rec[2] = 1
+        put(rec, 4, struct.pack('<h', p))
+        put(rec, 23, struct.pack('<h', p if p < 2 else -1))
+        nv = poly_vertices or (4 + p)
+        put(rec, 43, struct.pack('<H', nv))
+        payload += rec
+        for v in range(nv + 1):
+            vd = bytearray(33)
+            vd[0] = v % 2
+            put(vd, 1, struct.pack('<iiii', rc(), rc(), rc(), rc()))
+            put(vd, 17, real48(v * 30.0))
+            put(vd, 23, real48(v * 45.0 + 90))
+            put(vd, 29, struct.pack('<i', rnd.randint(0, 100000)))
+            payload += vd
+    secs.add("Polygons", 45, npoly, bytes(payload))
+
+    # Dimensions
+    payload = bytearray()
+    for d in range(2):
+        rec = bytearray(60)
+        rec[2] = 58
+        put(rec, 4, struct.pack('<h', d))
+        put(rec, 6, struct.pack('<iiii', rc(), rc(), rc(), rc()))
+        put(rec, 23, struct.pack('<iiiiiiii', rc(), rc(), rc(), rc(), 100000, 100000, 600000, 100000))
+        rec[55] = 1
+        rec[59] = d + 1
+        payload += rec
+    secs.add("Dimensions", 60, 2, bytes(payload))
+
+    s = "|RECORD=Rule|RULEKIND=SolderMaskExpansion|EXPANSION=4mil"
+    s2 = "|RECORD=Rule|RULEKIND=RoutingVias|MINHOLEWIDTH=28mil|MINWIDTH=50mil"
+    s3 = "|RECORD=Rule|RULEKIND=Clearance|SCOPE1COUNT=1|SCOPE1_0_KIND=Board|SCOPE2COUNT=1|SCOPE2_0_KIND=Board|GAP=10mil"
+    payload = b""
+    for x in (s, s2, s3):
+        payload += b"\x00\x00" + struct.pack('<H', len(x)) + x.encode()
+    secs.add("Rules", 0, 3, payload)
+
+    secs.add("Embeddeds", 16, 4, bytes(range(64)))
+
+    # Arcs
+    size = 56
+    payload = bytearray()
+    narcs = ncomp * 2 + 6
+    for a in range(narcs):
+        rec = bytearray(size)
+        kind = a % 4
+        rec[2] = [33, 57, 1, 32][kind]
+        net = a % nnets if kind == 2 else -1
+        comp = (a // 4) % ncomp if kind == 0 and ncomp else -1
+        poly = 1 if a == 3 else -1
+        put(rec, 4, struct.pack('<h', net))
+        put(rec, 11, struct.pack('<hh', poly, comp))
+        put(rec, 19, struct.pack('<iii', rc(), rc(), rnd.randint(1000, 500000)))
+        sa = [0, 90, 180, 270, 360][a % 5]
+        ea = [90, 180, 270, 360, 0, 45][a % 6] if a % 7 else sa
+        put(rec, 31, real48(sa))
+        put(rec, 37, real48(ea))
+        put(rec, 43, struct.pack('<i', 100000))
+        payload += rec
+    secs.add("Arcs", size, narcs, bytes(payload))
+
+    # Pads
+    size = 125
+    payload = bytearray()
+    npads = ncomp * 4 + 3
+    for p in range(npads):
+        rec = bytearray(size)
+        comp = p // 4 if p < ncomp * 4 else -1
+        rec[2] = [74, 1, 32, 56][p % 4] if comp != -1 else 74
+        net = p % nnets if p % 5 else -1
+        put(rec, 4, struct.pack('<h', net))
+        put(rec, 13, struct.pack('<h', comp))
+        put(rec, 19, struct.pack('<ii', rc(), rc()))
+        xs = 600000
+        stack = (p % 9 == 8) and p % 4 != 3 and comp != -1
+        put(rec, 27, struct.pack('<iiiiii', xs, xs, xs if not stack else 500000, xs, xs, xs))
+        put(rec, 51, struct.pack('<i', 300000))
+        rec[55] = [1, 2, 3][p % 3]
+        put(rec, 58, s8(str(p % 4 + 1)))
+        put(rec, 79, real48([0, 90, 45][p % 3]))
+        rec[85] = 0 if p % 6 == 5 else 1
+        payload += rec
+    secs.add("Pads", size, npads, bytes(payload))
+
+    # Vias
+    size = 75
+    payload = bytearray()
+    nvias = ncomp + 2
+    for v in range(nvias):
+        rec = bytearray(size)
+        rec[2] = 74
+        put(rec, 4, struct.pack('<h', v % nnets))
+        put(rec, 19, struct.pack('<iiII', rc(), rc(), 500000, 280000))
+        rec[35] = 1
+        rec[36] = 32
+        payload += rec
+    secs.add("Vias", size, nvias, bytes(payload))
+
+    # Tracks
+    size = 45
+    payload = bytearray()
+    for t in range(ntracks):
+        rec = bytearray(size)
+        kind = t % 5
+        rec[2] = [1, 32, 33, 57, 2][kind]
+        net = t % nnets if kind in (0, 1, 4) else -1
+        comp = (t // 5) % ncomp if kind == 2 and ncomp else -1
+        poly = 2 if (t % 11 == 10) else -1
+        put(rec, 4, struct.pack('<h', net))
+        put(rec, 11, struct.pack('<hh', poly, comp))
+        put(rec, 19, struct.pack('<iiiii', rc(), rc(), rc(), rc(), 100000 + t % 7))
+        put(rec, 39, struct.pack('<h', t % 3))
+        payload += rec
+    secs.add("Tracks", size, ntracks, bytes(payload))
+
+    # Texts
+    size = 320
+    payload = bytearray()
+    ntexts = ncomp * 2 + 3
+    for t in range(ntexts):
+        rec = bytearray(size)
+        comp = t // 2 if t < ncomp * 2 else -1
+        rec[2] = 33 if t % 4 else 34
+        put(rec, 13, struct.pack('<h', comp))
+        put(rec, 19, struct.pack('<iii', rc(), rc(), 600000))
+        put(rec, 33, real48([0, 90, 180][t % 3]))
+        put(rec, 40, s8(f"T{t}"))
+        put(rec, 296, struct.pack('<i', 80000))
+        if comp != -1:
+            rec[300] = t % 2
+            rec[301] = 1 - t % 2
+        payload += rec
+    secs.add("Texts", size, ntexts, bytes(payload))
+
+    # Fills
+    size = 46
+    payload = bytearray()
+    nfills = ncomp + 4
+    for f in range(nfills):
+        rec = bytearray(size)
+        comp = f if f < ncomp and f % 2 == 0 else -1
+        rec[2] = [1, 56, 33, 32][f % 4]
+        put(rec, 13, struct.pack('<h', comp))
+        put(rec, 19, struct.pack('<iiii', rc(), rc(), rc(), rc()))
+        put(rec, 35, real48([0, 30, 90][f % 3]))
+        payload += rec
+    secs.add("Fills", size, nfills, bytes(payload))
+
+    return secs.build()
+
+
+if __name__ == "__main__":
+    ncomp, ntracks, path = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+    with open(path, "wb") as f:
+        f.write(gen_pcb4(ncomp, ntracks))
@@ -0,0 +1,283 @@
+#!/usr/bin/python3
+
+# Generator of the test database tests/data/items.ddb: a small Jet 4
+# database with the 'Items' table of a Protel .DDB. Next to it, items.jsonl
+# holds the entries it was made from, in the line format of mdb-json (so
+# that the parser of the mdb-json path reads them). It is not produced by
+# mdb-json.
+#
+# The items cover a folder tree, content stored in the row, on a page of
+# its own and on a chain of pages, names in compressed and in plain UCS-2,
+# and a deleted row (which must not be read).
+#
+#     ./make_test_ddb.py [directory]
+
+import base64
+import json
+import os
+import struct
+import sys
+
+PAGE_SIZE = 4096
+LVAL_PAGE = 0x4C41564C          # 'LVAL' in the table field of a data page
+
+COLUMN_INT = 0x03
+COLUMN_LONGINT = 0x04
+COLUMN_TEXT = 0x0A
+COLUMN_OLE = 0x0B
+
+# Pages of the database
+HEADER_PAGE = 0
+USAGE_MAP_PAGE = 1
+CATALOG_PAGE = 2
+CATALOG_DATA_PAGE = 3
+ITEMS_PAGE = 4
+FIRST_ITEMS_DATA_PAGE = 5
+
+# Long values up to this size are stored in the row
+INLINE_SIZE = 64
+# Part of a long value on one page of a chain
+CHAIN_PART_SIZE = 4000
+
+
+def pattern (size, seed):
+    # Content that is different at every offset
+    return bytes((i * 7 + i // 251 + seed) & 0xFF for i in range(size))
+
+
+# Entries of the 'Items' table: ItemID, ParentID, ItemType, Name, content
+ITEMS = [
+    (1, 0, 1, "Documents", None),
+    (2, 0, 1, "Recycle Bin", None),
+    (3, 1, 1, "Boards", None),
+    (10, 1, 3, "readme.txt", b"Protel design database\r\n"),
+    (11, 3, 3, "logo.bmp", pattern(3000, 1)),
+    (12, 3, 3, "board.pcb", pattern(10000, 2)),
+    (13, 1, 3, "Ωmega.sch", pattern(40, 3)),
+    (14, 2, 3, "old.pcb", pattern(100, 4)),
+    ]
+
+# Entries that were deleted. Their rows are still on the page.
+DELETED_ITEMS = [
+    (15, 1, 3, "deleted.sch", b"deleted"),
+    ]
+
+
+def text (s):
+    # Text columns are compressed (FF FE + one byte per character) if
+    # all characters allow it
+    if all(0 < ord(c) < 256 for c in s):
+        return b"\xff\xfe" + s.encode("latin-1")
+    return s.encode("utf-16-le")
+
+
+def pointer (page, row):
+    return (page << 8) | row
+
+
+class Table:
+    '''
+    Table definition. 'columns' is a list of (name, type, size), size 0
+    for variable length columns.
+    '''
+    def __init__ (self, columns):
+        self.columns = []
+        fixed_offset = 0
+        var_index = 0
+        for number, (name, kind, size) in enumerate(columns):
+            column = {"name": name, "type": kind, "size": size, "number": number,
+                      "fixed_offset": 0, "var_index": 0}
+            if size > 0:
+                column["fixed_offset"] = fixed_offset
+                fixed_offset += size
+            else:
+                column["var_index"] = var_index
+                var_index += 1
+            self.columns.append(column)
+        self.fixed_size = fixed_offset
+        self.num_var = var_index
+
+    def definition (self, usage_map):
+        tdef = bytearray(63)
+        tdef[0] = 0x02
+        tdef[1] = 0x01
+        struct.pack_into("<H", tdef, 41, len(self.columns))      # Next column number
+        struct.pack_into("<H", tdef, 43, self.num_var)
+        struct.pack_into("<H", tdef, 45, len(self.columns))
+        struct.pack_into("<I", tdef, 55, usage_map)
+        struct.pack_into("<I", tdef, 59, usage_map)              # Free space map
+        for column in self.columns:
+            entry = bytearray(25)
+            entry[0] = column["type"]
+            struct.pack_into("<H", entry, 5, column["number"])
+            struct.pack_into("<H", entry, 7, column["var_index"])
+            struct.pack_into("<H", entry, 9, column["number"])
+            entry[15] = 0x03 if column["size"] > 0 else 0x02    # Fixed length, nullable
+            struct.pack_into("<H", entry, 21, column["fixed_offset"])
+            struct.pack_into("<H", entry, 23, column["size"])
+            tdef += entry
+        for column in self.columns:
+            name = column["name"].encode("utf-16-le")
+            tdef += struct.pack("<H", len(name)) + name
+        struct.pack_into("<I", tdef, 8, len(tdef))
+        return bytes(tdef).ljust(PAGE_SIZE, b"\0")
+
+    def row (self, values):
+        # 'values' maps column names to encoded values (missing = null)
+        mask = bytearray((len(self.columns) + 7) // 8)
+        fixed = bytearray(self.fixed_size)
+        var = [b""] * self.num_var
+        for column in self.columns:
+            value = values.get(column["name"], None)
+            if value is None:
+                continue
+            mask[column["number"] // 8] |= 1 << (column["number"] % 8)
+            if column["size"] > 0:
+                fixed[column["fixed_offset"]:column["fixed_offset"] + column["size"]] = value
+            else:
+                var[column["var_index"]] = value
+
+        row = bytearray(struct.pack("<H", len(self.columns))) + fixed
+        offsets = []
+        for value in var:
+            offsets.append(len(row))
+            row += value
+        offsets.append(len(row))
+        for offset in reversed(offsets):
+            row += struct.pack("<H", offset)
+        row += struct.pack("<H", self.num_var) + mask
+        return bytes(row)
+
+
+def data_page (table_page, rows):
+    # 'rows' is a list of (row, offset flags). Rows are stored from the
+    # end of the page.
+    header = bytearray(14)
+    header[0] = 0x01
+    header[1] = 0x01
+    struct.pack_into("<I", header, 4, table_page)
+    struct.pack_into("<H", header, 12, len(rows))
+    end = PAGE_SIZE
+    offsets = b""
+    body = b""
+    for row, flags in rows:
+        end -= len(row)
+        offsets += struct.pack("<H", end | flags)
+        body = row + body
+    page = bytearray(header + offsets)
+    struct.pack_into("<H", page, 2, end - len(page))
+    assert end >= len(page), "rows do not fit on the page"
+    return bytes(page.ljust(end, b"\0") + body)
+
+
+def header_page ():
+    # Jet 4 file header. The range from 0x18 is RC4 encrypted with a fixed
+    # key, here it is all zeros once decrypted (no database key).
+    page = bytearray(PAGE_SIZE)
+    page[0x01] = 0x01
+    page[0x04:0x14] = b"Standard Jet DB\0"
+    page[0x14] = 1
+    key = struct.pack("<I", 0x6B39DAC7)
+    state = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + state[i] + key[i % len(key)]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+    i = j = 0
+    for offset in range(0x18, 0x18 + 128):
+        i = (i + 1) & 0xFF
+        j = (j + state[i]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+        page[offset] = state[(state[i] + state[j]) & 0xFF]
+    return bytes(page)
+
+
+def usage_map (first_page, pages):
+    # Usage map type 0: first page and bitmap of the pages from there
+    bitmap = bytearray((max(pages) - first_page) // 8 + 1)
+    for page in pages:
+        bit = page - first_page
+        bitmap[bit // 8] |= 1 << (bit % 8)
+    return bytes([0]) + struct.pack("<I", first_page) + bytes(bitmap)
+
+
+def make_database ():
+    pages = {}
+    next_page = [FIRST_ITEMS_DATA_PAGE + 1]
+
+    def allocate ():
+        number = next_page[0]
+        next_page[0] += 1
+        return number
+
+    def long_value (data):
+        # 12 byte header, followed by the data if it is stored in the row
+        if len(data) <= INLINE_SIZE:
+            return struct.pack("<III", len(data) | 0x80000000, 0, 0) + data
+        if len(data) <= CHAIN_PART_SIZE:
+            number = allocate()
+            pages[number] = data_page(LVAL_PAGE, [(data, 0)])
+            return struct.pack("<III", len(data) | 0x40000000, pointer(number, 0), 0)
+        parts = [data[i:i + CHAIN_PART_SIZE] for i in range(0, len(data), CHAIN_PART_SIZE)]
+        numbers = [allocate() for part in parts]
+        for i, part in enumerate(parts):
+            next_part = pointer(numbers[i + 1], 0) if i + 1 < len(parts) else 0
+            pages[numbers[i]] = data_page(LVAL_PAGE, [(struct.pack("<I", next_part) + part, 0)])
+        return struct.pack("<III", len(data), pointer(numbers[0], 0), 0)
+
+    catalog = Table([("Id", COLUMN_LONGINT, 4), ("ParentId", COLUMN_LONGINT, 4),
+                     ("Name", COLUMN_TEXT, 0), ("Type", COLUMN_INT, 2),
+                     ("Flags", COLUMN_LONGINT, 4)])
+    items = Table([("ItemID", COLUMN_LONGINT, 4), ("Name", COLUMN_TEXT, 0),
+                   ("ParentID", COLUMN_LONGINT, 4), ("ItemType", COLUMN_LONGINT, 4),
+                   ("Data", COLUMN_OLE, 0)])
+
+    def item_row (item):
+        item_id, parent_id, item_type, name, data = item
+        values = {"ItemID": struct.pack("<i", item_id), "ParentID": struct.pack("<i", parent_id),
+                  "ItemType": struct.pack("<i", item_type), "Name": text(name)}
+        if data is not None:
+            values["Data"] = long_value(data)
+        return items.row(values)
+
+    # The deleted row sits between the others
+    rows = [(item_row(item), 0) for item in ITEMS]
+    rows[4:4] = [(item_row(item), 0x8000) for item in DELETED_ITEMS]
+    pages[FIRST_ITEMS_DATA_PAGE] = data_page(ITEMS_PAGE, rows)
+
+    def catalog_row (object_id, name):
+        return catalog.row({"Id": struct.pack("<i", object_id), "ParentId": struct.pack("<i", 0),
+                            "Name": text(name), "Type": struct.pack("<h", 1),
+                            "Flags": struct.pack("<i", 0)})
+
+    pages[HEADER_PAGE] = header_page()
+    pages[USAGE_MAP_PAGE] = data_page(0, [(usage_map(CATALOG_DATA_PAGE, [CATALOG_DATA_PAGE]), 0),
+                                          (usage_map(FIRST_ITEMS_DATA_PAGE,
+                                                     [FIRST_ITEMS_DATA_PAGE]), 0)])
+    pages[CATALOG_PAGE] = catalog.definition(pointer(USAGE_MAP_PAGE, 0))
+    pages[CATALOG_DATA_PAGE] = data_page(CATALOG_PAGE, [(catalog_row(CATALOG_PAGE, "MSysObjects"), 0),
+                                                        (catalog_row(ITEMS_PAGE, "Items"), 0)])
+    pages[ITEMS_PAGE] = items.definition(pointer(USAGE_MAP_PAGE, 1))
+    return b"".join(pages[number] for number in range(len(pages)))
+
+
+def mdb_json_lines ():
+    # The entries in the line format of mdb-json: null columns are left
+    # out, binary data is base64 encoded
+    lines = []
+    for item_id, parent_id, item_type, name, data in ITEMS:
+        j = {"ItemID": item_id, "Name": name, "ParentID": parent_id, "ItemType": item_type}
+        if data is not None:
+            j["Data"] = {"$binary": base64.b64encode(data).decode("ascii")}
+        lines.append(json.dumps(j) + "\n")
+    return "".join(lines)
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "data")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "items.ddb"), "wb") as f:
+        f.write(make_database())
+    with open(os.path.join(directory, "items.jsonl"), "w") as f:
+        f.write(mdb_json_lines())